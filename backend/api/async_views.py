@@ -0,0 +1,102 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections, connection
+
+
+def run_query(request, func, *args, **kwargs):
+    """Выполняет func в потоке пула со своим соединением с базой.
+
+    Запросы учитываются в request.query_stats, соединение закрывается
+    по тем же правилам, что и в конце обычного запроса: при
+    ASYNC_READ_VIEWS соединения постоянные (CONN_MAX_AGE), и поток пула
+    переиспользует своё соединение, а не открывает новое на каждый вызов.
+    """
+    close_old_connections()
+    try:
+        stats = getattr(request, 'query_stats', None)
+        if stats is None:
+            return func(*args, **kwargs)
+        with connection.execute_wrapper(stats):
+            return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def is_asgi_request(request):
+    """Пришёл ли запрос через ASGI. Потоковый ответ там перебирается в
+    цикле событий (Django 3.2), где обращаться к ORM нельзя."""
+    return isinstance(getattr(request, '_request', request), ASGIRequest)
+
+
+async def run_in_thread(request, func, *args, **kwargs):
+    return await sync_to_async(run_query, thread_sensitive=False)(
+        request, func, *args, **kwargs)
+
+
+async def gather_queries(request, *calls):
+    """Выполняет независимые вызовы (func, *args) одновременно."""
+    return await asyncio.gather(*(
+        run_in_thread(request, func, *args) for func, *args in calls))
+
+
+class AsyncReadMixin:
+    """Асинхронные обработчики GET для развёртывания через ASGI.
+
+    При ASYNC_READ_VIEWS маршруты, где GET ведёт на действие из
+    async_actions, обслуживаются корутиной: DRF и ORM работают в потоках
+    пула, не занимая поток на всё время запроса. Действие выполняет
+    метод async_<действие>; по умолчанию — синхронный обработчик в
+    потоке. Остальные методы идут через синхронный адаптер.
+    """
+
+    async_actions = ('list', 'retrieve')
+
+    @classmethod
+    def as_view(cls, actions=None, **initkwargs):
+        sync_view = super().as_view(actions, **initkwargs)
+        if not settings.ASYNC_READ_VIEWS or not actions or (
+                actions.get('get') not in cls.async_actions):
+            return sync_view
+
+        async def view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return await sync_to_async(sync_view)(
+                    request, *args, **kwargs)
+            self = cls(**initkwargs)
+            self.action_map = {'get': actions['get'], 'head': actions['get']}
+            return await self.async_dispatch(request, *args, **kwargs)
+
+        view.cls = cls
+        view.initkwargs = initkwargs
+        view.actions = actions
+        view.csrf_exempt = True
+        return view
+
+    async def async_dispatch(self, request, *args, **kwargs):
+        """Аналог APIView.dispatch для действий из async_actions."""
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            await run_in_thread(
+                request, self.initial, request, *args, **kwargs)
+            handler = getattr(self, f'async_{self.action}')
+            response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs)
+        return self.response
+
+    async def async_list(self, request, *args, **kwargs):
+        return await run_in_thread(
+            request, self.list, request, *args, **kwargs)
+
+    async def async_retrieve(self, request, *args, **kwargs):
+        return await run_in_thread(
+            request, self.retrieve, request, *args, **kwargs)
@@ -0,0 +1,136 @@
+from threading import local
+from time import time_ns
+
+from django.contrib.auth import get_user_model
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from .catalog import is_cache_shared
+
+User = get_user_model()
+
+TOKEN_KEY = 'auth_token_{}'
+GENERATION_KEY = 'auth_token_generation_{}'
+AUTH_CACHE_TIMEOUT = 60 * 5
+EXCLUDED_FIELDS = frozenset(('password',))
+
+_pending = local()
+
+
+def use_auth_cache():
+    """Кэшируется ли аутентификация.
+
+    Кэш должен быть общим для процессов, иначе сбросы не дойдут до
+    остальных, и не лежать в базе: с DatabaseCache чтение из кэша —
+    такой же запрос к базе, как проверка токена.
+    """
+    return is_cache_shared() and not isinstance(
+        caches[DEFAULT_CACHE_ALIAS], DatabaseCache)
+
+
+def get_field_names():
+    return [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname not in EXCLUDED_FIELDS]
+
+
+def get_cached_user(key):
+    """Пользователь токена из кэша и текущее поколение токена.
+
+    Запись и поколение читаются одним get_many; запись действительна,
+    только если сделана при текущем поколении. Пароль в кэш не
+    попадает и загружается из базы при обращении.
+    """
+    token_key, generation_key = (
+        TOKEN_KEY.format(key), GENERATION_KEY.format(key))
+    cached = cache.get_many((token_key, generation_key))
+    generation = cached.get(generation_key)
+    entry = cached.get(token_key)
+    if generation is None or entry is None or entry[0] != generation:
+        return None, generation
+    return User.from_db('default', get_field_names(), entry[1]), generation
+
+
+def cache_user(key, user, generation):
+    """Кэширует пользователя с поколением, прочитанным до запроса к
+    базе: если токен сбросили позже, запись не будет прочитана."""
+    if generation is None:
+        generation = time_ns()
+        if not cache.add(
+                GENERATION_KEY.format(key), generation, AUTH_CACHE_TIMEOUT):
+            return
+    cache.set(TOKEN_KEY.format(key), (generation, [
+        getattr(user, name) for name in get_field_names()]),
+        AUTH_CACHE_TIMEOUT)
+
+
+def forget_tokens(keys):
+    """Меняет поколение токенов, и их записи в кэше больше не читаются."""
+    generation = time_ns()
+    cache.set_many({
+        GENERATION_KEY.format(key): generation for key in keys},
+        AUTH_CACHE_TIMEOUT)
+
+
+def forget_token(key):
+    forget_tokens((key,))
+
+
+def invalidate_token(key):
+    if use_auth_cache():
+        transaction.on_commit(lambda: forget_token(key))
+
+
+def invalidate_user(user_id):
+    """Сбрасывает кэш токенов пользователя после фиксации транзакции.
+
+    Токены всех пользователей одной транзакции находятся одним
+    запросом к базе.
+    """
+    if not use_auth_cache():
+        return
+    pending = getattr(_pending, 'user_ids', None)
+    if pending is None:
+        pending = _pending.user_ids = set()
+    pending.add(user_id)
+    transaction.on_commit(forget_pending_users)
+
+
+def forget_pending_users():
+    user_ids = getattr(_pending, 'user_ids', None)
+    _pending.user_ids = None
+    if user_ids:
+        forget_tokens(Token.objects.filter(
+            user_id__in=user_ids).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену без запроса к базе на каждый запрос.
+
+    Данные пользователя лежат в кэше под ключом токена, и проверка
+    токена — одно обращение к кэшу. Удаление токена (выход), сохранение
+    пользователя (смена пароля, деактивация) и изменение его счётчиков
+    меняют поколение токена, так что запись, сделанная по данным до
+    изменения, уже не читается. С DatabaseCache или локальным для
+    процесса кэшем токен проверяется по базе, как в TokenAuthentication.
+    """
+
+    def authenticate_credentials(self, key):
+        if not use_auth_cache():
+            return super().authenticate_credentials(key)
+        user, generation = get_cached_user(key)
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            cache_user(key, user, generation)
+            return user, token
+        if not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        token = self.get_model().from_db(
+            'default', ['key', 'user_id'], [key, user.pk])
+        token.user = user
+        return user, token
@@ -0,0 +1,115 @@
+from math import ceil
+from statistics import mean
+from time import perf_counter
+from urllib.parse import urlencode
+
+from django.db.models import Count
+from django.urls import reverse
+from recipes.models import Ingredient, Recipe, Tag
+
+from .catalog import bump_catalog_version
+from .recipe_cache import ALL_RECIPES
+
+PERCENTILES = (50, 95, 99)
+REPEAT = 50
+BENCHMARK_REQUESTS = (
+    ('recipes-list', (), {'limit': '6'}),
+    ('recipes-list', (), {'limit': '24'}),
+    ('recipes-list', (), {'limit': '6', 'tags': '{tag}'}),
+    ('recipes-list', (), {'limit': '6', 'is_favorited': '1'}),
+    ('recipes-list', (), {'limit': '6', 'is_in_shopping_cart': '1'}),
+    ('recipes-list', (), {'limit': '6', 'search': '{word}'}),
+    ('recipes-list', (), {
+        'limit': '6', 'pantry': '{pantry}', 'missing': '2'}),
+    ('recipes-detail', ('{recipe}',), {}),
+    ('recipes-get-link', ('{recipe}',), {}),
+    ('recipes-download-shopping-cart', (), {}),
+    ('user-list', (), {'limit': '6'}),
+    ('user-detail', ('{user}',), {}),
+    ('user-me', (), {}),
+    ('user-subscriptions', (), {'limit': '6', 'recipes_limit': '3'}),
+    ('tags-list', (), {}),
+    ('ingredients-list', (), {'name': 'а'}),
+)
+
+
+def get_percentile(values, percentile):
+    """Перцентиль методом ближайшего ранга."""
+    values = sorted(values)
+    return values[max(ceil(percentile / 100 * len(values)) - 1, 0)]
+
+
+def get_placeholders(user):
+    """Значения для подстановки в адреса: самые популярные объекты."""
+    recipe = Recipe.objects.order_by('-favorites_count', 'pk').first()
+    tag = Tag.objects.annotate(recipes=Count('recipe')).order_by(
+        '-recipes').first()
+    pantry = Ingredient.objects.annotate(
+        recipe_count=Count('recipes')).order_by(
+            '-recipe_count').values_list('pk', flat=True)[:10]
+    return {
+        'recipe': recipe.pk if recipe else 0,
+        'user': user.pk,
+        'tag': tag.slug if tag else '',
+        'word': recipe.name.split()[0] if recipe else '',
+        'pantry': ','.join(map(str, pantry)),
+    }
+
+
+def get_benchmark_urls(placeholders):
+    """Пары (метка, адрес); метка не зависит от данных и годится для
+    сравнения прогонов."""
+    for url_name, args, params in BENCHMARK_REQUESTS:
+        label = url_name
+        url = reverse(f'api:{url_name}', args=[
+            arg.format(**placeholders) for arg in args])
+        if params:
+            label += '?' + '&'.join(
+                f'{param}={value}' for param, value in params.items())
+            url += '?' + urlencode({
+                param: value.format(**placeholders)
+                for param, value in params.items()})
+        yield label, url
+
+
+def get_content_length(response):
+    if response.streaming:
+        return len(b''.join(response.streaming_content))
+    return len(response.content)
+
+
+def run_benchmark(client, user, repeat=REPEAT, cold=False):
+    """Замеряет задержку, число запросов к базе и размер ответа.
+
+    Перед замерами каждый адрес запрашивается один раз для прогрева;
+    при cold=True перед каждым запросом сбрасывается кэш страниц
+    рецептов. Возвращает словарь метка -> показатели.
+    """
+    results = {}
+    for label, url in get_benchmark_urls(get_placeholders(user)):
+        get_content_length(client.get(url))
+        timings, queries, cache_queries, db_timings = [], [], [], []
+        for _ in range(repeat):
+            if cold:
+                bump_catalog_version(ALL_RECIPES)
+            start = perf_counter()
+            response = client.get(url)
+            length = get_content_length(response)
+            timings.append((perf_counter() - start) * 1000)
+            stats = getattr(response, 'query_stats', {})
+            queries.append(stats.get('queries', 0))
+            cache_queries.append(stats.get('cache_queries', 0))
+            db_timings.append(stats.get('db', 0) * 1000)
+        results[label] = {
+            'url': url,
+            'status': response.status_code,
+            'bytes': length,
+            'queries': max(queries),
+            'cache_queries': max(cache_queries),
+            'db_ms': round(mean(db_timings), 3),
+            'mean_ms': round(mean(timings), 3),
+            **{f'p{percentile}_ms': round(
+                get_percentile(timings, percentile), 3)
+               for percentile in PERCENTILES},
+        }
+    return results
@@ -0,0 +1,163 @@
+from abc import ABC, abstractmethod
+from threading import Lock, local
+from time import time_ns
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.base import BaseCache
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from recipes.models import Tag
+
+CATALOG_VERSION_KEY = 'catalog_version_{}'
+TAG_MAP_KEY = 'tag_map_{}'
+PROCESS_LOCAL_CACHES = (DummyCache, LocMemCache)
+
+
+def is_cache_shared():
+    """Виден ли кэш по умолчанию всем процессам: только через него
+    до других процессов доходят смены версий и сбросы записей."""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], PROCESS_LOCAL_CACHES)
+
+
+def get_catalog_version(catalog):
+    """Версия справочника; меняется при каждой записи в него.
+
+    Начальное значение — время первого обращения, чтобы версии не
+    повторялись после очистки кэша.
+    """
+    key = CATALOG_VERSION_KEY.format(catalog)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_catalog_version(catalog):
+    """Меняет версию справочника и возвращает новую.
+
+    Версия растёт на единицу, и если новая ровно на единицу больше
+    прочитанной перед этим, других записей между чтением и сменой не
+    было. В Memcached это атомарный incr; базовый incr остальных
+    бэкендов (DatabaseCache) — чтение и запись со сроком по умолчанию,
+    поэтому для них версия пишется без срока, а одновременные смены
+    могут получить одно значение.
+    """
+    key = CATALOG_VERSION_KEY.format(catalog)
+    if type(caches[DEFAULT_CACHE_ALIAS]).incr is not BaseCache.incr:
+        try:
+            return cache.incr(key)
+        except ValueError:
+            version = time_ns()
+    else:
+        version = cache.get(key)
+        version = time_ns() if version is None else version + 1
+    cache.set(key, version, timeout=None)
+    return version
+
+
+def get_tag_map():
+    """Словарь slug -> id тегов; пересчитывается при смене версии."""
+    key = TAG_MAP_KEY.format(get_catalog_version('tags'))
+    tag_map = cache.get(key)
+    if tag_map is None:
+        tag_map = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_map)
+    return tag_map
+
+
+class VersionedIndex(ABC):
+    """Основа индексов рецептов в памяти процесса.
+
+    Изменения рецептов применяются к индексу этого процесса сразу после
+    фиксации транзакции, остальные процессы видят только смену версии и
+    перестраивают индекс целиком: любая запись в одном процессе стоит
+    остальным полного чтения рецептов из базы. Перестройка идёт под
+    отдельной блокировкой, и поиск до её окончания работает по прежнему
+    индексу. Наследники задают catalog, get_documents, _reset, _add и
+    _remove.
+    """
+
+    catalog = None
+
+    def __init__(self):
+        self._lock = Lock()
+        self._build_lock = Lock()
+        self._pending = local()
+        self._version = None
+        self._reset()
+
+    @abstractmethod
+    def get_documents(self, recipe_ids=None):
+        """Словарь id рецепта -> документ; без recipe_ids — все."""
+
+    @abstractmethod
+    def _reset(self):
+        pass
+
+    @abstractmethod
+    def _add(self, recipe_id, document):
+        pass
+
+    @abstractmethod
+    def _remove(self, recipe_id):
+        pass
+
+    def build(self):
+        with self._build_lock:
+            self._build(get_catalog_version(self.catalog))
+
+    def _build(self, version):
+        documents = self.get_documents()
+        with self._lock:
+            self._reset()
+            for recipe_id, document in documents.items():
+                self._add(recipe_id, document)
+            self._version = version
+
+    def ensure_current(self):
+        version = get_catalog_version(self.catalog)
+        if version != self._version:
+            with self._build_lock:
+                if version != self._version:
+                    self._build(version)
+
+    def update(self, recipe_ids):
+        """Переиндексирует рецепты; удалённые исчезают из индекса.
+
+        Если версия сменилась в другом процессе до или во время записи,
+        индекс не правится, а перестраивается при следующем поиске.
+        """
+        with self._build_lock:
+            version = get_catalog_version(self.catalog)
+            in_sync = self._version == version
+            if in_sync:
+                documents = self.get_documents(recipe_ids)
+            new_version = bump_catalog_version(self.catalog)
+            if not in_sync or new_version != version + 1:
+                return
+            with self._lock:
+                for recipe_id in recipe_ids:
+                    self._remove(recipe_id)
+                    if recipe_id in documents:
+                        self._add(recipe_id, documents[recipe_id])
+                self._version = new_version
+
+    def invalidate(self):
+        bump_catalog_version(self.catalog)
+
+    def schedule_update(self, recipe_ids):
+        """Откладывает переиндексацию до фиксации транзакции,
+        объединяя изменения одной транзакции."""
+        pending = getattr(self._pending, 'ids', None)
+        if pending is None:
+            pending = self._pending.ids = set()
+        pending.update(recipe_ids)
+        transaction.on_commit(self._flush)
+
+    def _flush(self):
+        recipe_ids = getattr(self._pending, 'ids', None)
+        self._pending.ids = None
+        if recipe_ids:
+            self.update(recipe_ids)
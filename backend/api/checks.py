@@ -0,0 +1,14 @@
+from django.core.checks import Warning, register
+
+from .catalog import is_cache_shared
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    if is_cache_shared():
+        return []
+    return [Warning(
+        'Кэш по умолчанию локален для процесса: другие процессы не видят '
+        'смены версий справочников, страниц рецептов и индексов.',
+        hint='Укажите общий кэш в CACHES, например Memcached.',
+        id='api.W001')]
@@ -1,38 +1,118 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Case, Exists, IntegerField, OuterRef, When
 from django_filters import rest_framework as filters
-from recipes.models import Ingredient, Recipe
+from rest_framework.filters import BaseFilterBackend
+from recipes.models import Recipe
+
+from .catalog import get_tag_map
+from .pantry_index import pantry_index
+from .recipe_search import recipe_search_index
 
 User = get_user_model()
+INGREDIENT_PARAMS = (
+    'ingredients', 'ingredients_any', 'exclude_ingredients', 'pantry',
+    'missing')
 
 
-class IngredientFilter(filters.FilterSet):
-    """Фильтр для ингредиентов по названию."""
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
 
-    name = filters.CharFilter(lookup_expr='istartswith')
 
-    class Meta:
-        model = Ingredient
-        fields = ('name',)
+class TagSlugFilter(filters.MultipleChoiceFilter):
+    """Рецепты хотя бы с одним из тегов.
+
+    Слаги проверяются и переводятся в id по закэшированному словарю
+    тегов, а отбор идёт через EXISTS, поэтому рецепты не дублируются
+    и DISTINCT не нужен.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('choices', lambda: [
+            (slug, slug) for slug in get_tag_map()])
+        kwargs.setdefault('distinct', False)
+        super().__init__(*args, **kwargs)
+
+    def filter(self, queryset, value):
+        if not value:
+            return queryset
+        tag_map = get_tag_map()
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'),
+            tag_id__in=[tag_map[slug] for slug in value if slug in tag_map])))
 
 
 class RecipeFilter(filters.FilterSet):
-    """Фильтр длярецептов по тэгам, авторам, избранному и корзине."""
+    """Фильтр длярецептов по тэгам, авторам, избранному и корзине.
+
+    Отбор по ингредиентам выполняется по битовым маскам pantry_index:
+    ingredients — все из списка, ingredients_any — хотя бы один,
+    exclude_ingredients — ни одного, pantry и missing — рецепты, для
+    которых кроме pantry нужно не больше missing ингредиентов.
+    """
 
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = TagSlugFilter()
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
+    ingredients = NumberInFilter(method='filter_ingredients')
+    ingredients_any = NumberInFilter(method='filter_ingredients')
+    exclude_ingredients = NumberInFilter(method='filter_ingredients')
+    pantry = NumberInFilter(method='filter_ingredients')
+    missing = filters.NumberFilter(method='filter_ingredients')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        data = self.form.cleaned_data
+        if all(data.get(param) is None for param in INGREDIENT_PARAMS):
+            return queryset
+        pantry = None
+        if data.get('pantry') is not None or data.get('missing') is not None:
+            pantry = self.get_ids('pantry')
+        exclude, recipe_ids = pantry_index.filter(
+            include=self.get_ids('ingredients'),
+            include_any=self.get_ids('ingredients_any'),
+            exclude=self.get_ids('exclude_ingredients'),
+            pantry=pantry, missing=int(data.get('missing') or 0))
+        if exclude:
+            return queryset.exclude(pk__in=recipe_ids)
+        return queryset.filter(pk__in=recipe_ids)
+
+    def get_ids(self, param):
+        values = self.form.cleaned_data.get(param) or ()
+        return [int(value) for value in values]
+
+    def filter_ingredients(self, queryset, name, value):
+        """Применяется вместе с остальными в filter_queryset."""
+        return queryset
 
     def filter_is_favorited(self, queryset, name, value):
         if value:
-            return queryset.filter(favorite__user_id=self.request.user.id)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if value:
-            return queryset.filter(customer__user_id=self.request.user.id)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
 
     class Meta:
         model = Recipe
         fields = ('tags', 'author')
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск рецептов по индексу в памяти."""
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        recipe_ids = recipe_search_index.search(query)
+        if not recipe_ids:
+            return queryset.none()
+        return queryset.filter(pk__in=recipe_ids).order_by(Case(
+            *(When(pk=recipe_id, then=position)
+              for position, recipe_id in enumerate(recipe_ids)),
+            output_field=IntegerField()))
@@ -0,0 +1,100 @@
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from threading import Lock
+
+from recipes.models import Ingredient
+
+from .catalog import bump_catalog_version, get_catalog_version
+from .serializers.recipes_serializers import IngredientSerializer
+
+SEARCH_LIMIT = 50
+MIN_TRIGRAM_QUERY_LENGTH = 3
+MIN_TRIGRAM_SIMILARITY = 0.5
+
+
+def normalize(name):
+    return name.lower().replace('ё', 'е').strip()
+
+
+def get_trigrams(name):
+    padded = f' {name} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Строится при первом запросе и перестраивается, когда меняется
+    версия справочника ингредиентов. Поиск обращается только к кэшу за
+    версией: к базе он не ходит лишь при Memcached, с DatabaseCache
+    проверка версии — один запрос к таблице кэша.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._names = []
+        self._rows = []
+        self._trigrams = {}
+
+    def invalidate(self):
+        bump_catalog_version('ingredients')
+
+    def _get_current(self):
+        version = get_catalog_version('ingredients')
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._build(version)
+        return self._names, self._rows, self._trigrams
+
+    def _build(self, version):
+        rows = sorted(
+            IngredientSerializer(Ingredient.objects.all(), many=True).data,
+            key=lambda row: normalize(row['name']))
+        names = [normalize(row['name']) for row in rows]
+        trigrams = defaultdict(list)
+        for position, name in enumerate(names):
+            for trigram in get_trigrams(name):
+                trigrams[trigram].append(position)
+        self._names, self._rows = names, rows
+        self._trigrams = dict(trigrams)
+        self._version = version
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Совпадения по порядку: точные, по префиксу, по вхождению,
+        затем похожие по триграммам."""
+        names, rows, trigrams = self._get_current()
+        query = normalize(query)
+        start = bisect_left(names, query)
+        end = bisect_left(names, query + '\uffff', lo=start)
+        exact = [
+            position for position in range(start, end)
+            if names[position] == query]
+        found = exact + [
+            position for position in range(start, end)
+            if names[position] != query]
+        if len(found) < limit:
+            found += [
+                position for position, name in enumerate(names)
+                if query in name and not start <= position < end]
+        if len(found) < limit and len(query) >= MIN_TRIGRAM_QUERY_LENGTH:
+            found += self._similar(query, names, trigrams, set(found))
+        return [rows[position] for position in found[:limit]]
+
+    def _similar(self, query, names, trigrams, exclude):
+        query_trigrams = get_trigrams(query)
+        matches = Counter(
+            position for trigram in query_trigrams
+            for position in trigrams.get(trigram, ())
+            if position not in exclude)
+        scored = []
+        for position, common in matches.items():
+            similarity = 2 * common / (
+                len(query_trigrams) + len(get_trigrams(names[position])))
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scored.append((-similarity, position))
+        return [position for _, position in sorted(scored)]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connection
+
+from .query_budgets import get_budget
+
+logger = logging.getLogger(__name__)
+
+DATABASE_CACHE = 'django.core.cache.backends.db.DatabaseCache'
+TRANSACTION_STATEMENTS = (
+    'BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+def get_cache_tables():
+    return tuple(
+        config['LOCATION'] for config in settings.CACHES.values()
+        if config['BACKEND'] == DATABASE_CACHE)
+
+
+class QueryStats:
+    """Счётчик запросов к базе для connection.execute_wrapper.
+
+    Запросы к таблицам DatabaseCache (cache_queries) и управление
+    транзакциями — BEGIN и точки сохранения (transaction_queries) —
+    считаются отдельно от запросов API (queries): первые зависят от
+    бэкенда кэша, вторые — от того, идёт ли запрос внутри транзакции.
+    """
+
+    def __init__(self):
+        self.queries = self.cache_queries = self.transaction_queries = 0
+        self.db_time = self.cache_time = 0
+        self.view_start = self.view_end = None
+        self._lock = Lock()
+        self._cache_tables = get_cache_tables()
+
+    def __call__(self, execute, sql, params, many, context):
+        is_cache = any(table in sql for table in self._cache_tables)
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - start
+            with self._lock:
+                if is_cache:
+                    self.cache_queries += 1
+                    self.cache_time += elapsed
+                else:
+                    if sql.startswith(TRANSACTION_STATEMENTS):
+                        self.transaction_queries += 1
+                    else:
+                        self.queries += 1
+                    self.db_time += elapsed
+
+    def as_dict(self, total_time):
+        """Время в секундах: db — запросы API и транзакции, cache —
+        запросы к таблицам кэша, view — работа вьюхи без базы (для
+        чтения это в основном сериализация), render — отрисовка ответа."""
+        view_time = render_time = 0
+        if self.view_start is not None and self.view_end is not None:
+            view_time = self.view_end - self.view_start
+            render_time = perf_counter() - self.view_end
+        return {
+            'queries': self.queries, 'cache_queries': self.cache_queries,
+            'transaction_queries': self.transaction_queries,
+            'db': self.db_time, 'cache': self.cache_time,
+            'view': max(view_time - self.db_time - self.cache_time, 0),
+            'render': render_time, 'total': total_time}
+
+
+class QueryBudgetMiddleware:
+    """Число запросов к базе и время обработки по действиям API.
+
+    Итоги сохраняются в response.query_stats, при DEBUG отдаются в
+    заголовке Server-Timing. Превышение бюджета из QUERY_BUDGETS
+    пишется в лог. Под ASGI запросы считаются асинхронными
+    обработчиками чтения, которые выполняют их в потоках пула.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        stats = request.query_stats = QueryStats()
+        start = perf_counter()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        return self.process_stats(request, response, stats, start)
+
+    async def __acall__(self, request):
+        stats = request.query_stats = QueryStats()
+        start = perf_counter()
+        response = await self.get_response(request)
+        return self.process_stats(request, response, stats, start)
+
+    def process_stats(self, request, response, stats, start):
+        response.query_stats = stats.as_dict(perf_counter() - start)
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.url_name if match else None
+        response.query_stats['action'] = url_name
+        budget = get_budget(request.method, url_name)
+        if budget is not None and stats.queries > budget:
+            logger.warning(
+                'Превышен бюджет запросов %s %s: %s из %s',
+                request.method, url_name, stats.queries, budget)
+        if settings.DEBUG:
+            response['Server-Timing'] = self.get_server_timing(
+                response.query_stats)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_stats.view_start = perf_counter()
+
+    def process_template_response(self, request, response):
+        request.query_stats.view_end = perf_counter()
+        return response
+
+    @staticmethod
+    def get_server_timing(stats):
+        return ', '.join((
+            f'db;dur={stats["db"] * 1000:.1f};desc="{stats["queries"]} SQL, '
+            f'{stats["transaction_queries"]} TX"',
+            f'cache;dur={stats["cache"] * 1000:.1f};'
+            f'desc="{stats["cache_queries"]} SQL"',
+            f'view;dur={stats["view"] * 1000:.1f}',
+            f'render;dur={stats["render"] * 1000:.1f}',
+            f'total;dur={stats["total"] * 1000:.1f}'))
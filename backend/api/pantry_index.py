@@ -0,0 +1,130 @@
+from recipes.models import IngredientAmount, Recipe
+
+from .catalog import VersionedIndex
+
+PANTRY_CATALOG = 'recipe_pantry'
+MAX_MISSING = 20
+
+
+def get_positions(mask):
+    """Номера установленных битов маски по возрастанию."""
+    return [
+        position for position, bit in enumerate(reversed(bin(mask)[2:]))
+        if bit == '1']
+
+
+class PantryIndex(VersionedIndex):
+    """Битовые маски рецептов по ингредиентам.
+
+    Бит рецепта в маске ингредиента установлен, если ингредиент входит
+    в рецепт, так что отбор по ингредиентам сводится к операциям над
+    целыми числами вместо соединений IngredientAmount. Маски других
+    процессов после записи рецепта строятся заново целиком, см.
+    VersionedIndex.
+    """
+
+    catalog = PANTRY_CATALOG
+
+    def _reset(self):
+        self._masks = {}
+        self._positions = {}
+        self._recipe_ids = []
+        self._ingredients = {}
+        self._all = 0
+
+    def get_documents(self, recipe_ids=None):
+        recipes = Recipe.objects.all()
+        amounts = IngredientAmount.objects.all()
+        if recipe_ids is not None:
+            recipes = recipes.filter(pk__in=recipe_ids)
+            amounts = amounts.filter(recipe_id__in=recipe_ids)
+        documents = {
+            recipe_id: set()
+            for recipe_id in recipes.values_list('id', flat=True).iterator()}
+        for recipe_id, ingredient_id in amounts.values_list(
+                'recipe_id', 'ingredient_id').iterator():
+            if recipe_id in documents:
+                documents[recipe_id].add(ingredient_id)
+        return documents
+
+    def _add(self, recipe_id, document):
+        position = self._positions.get(recipe_id)
+        if position is None:
+            position = self._positions[recipe_id] = len(self._recipe_ids)
+            self._recipe_ids.append(recipe_id)
+        bit = 1 << position
+        for ingredient_id in document:
+            self._masks[ingredient_id] = self._masks.get(
+                ingredient_id, 0) | bit
+        self._ingredients[recipe_id] = document
+        self._all |= bit
+
+    def _remove(self, recipe_id):
+        if recipe_id not in self._ingredients:
+            return
+        bit = 1 << self._positions[recipe_id]
+        for ingredient_id in self._ingredients.pop(recipe_id):
+            mask = self._masks[ingredient_id] & ~bit
+            if mask:
+                self._masks[ingredient_id] = mask
+            else:
+                del self._masks[ingredient_id]
+        self._all &= ~bit
+
+    def _get_missing_mask(self, pantry, missing):
+        """Рецепты, для которых вне pantry не больше missing ингредиентов.
+
+        Число недостающих ингредиентов считается сразу для всех рецептов
+        побитовым сумматором: counters[i] — i-й разряд счётчика.
+        """
+        counters = [0] * (missing + 1).bit_length()
+        overflow = 0
+        for ingredient_id, mask in self._masks.items():
+            if ingredient_id in pantry:
+                continue
+            carry = mask
+            for position, counter in enumerate(counters):
+                counters[position] = counter ^ carry
+                carry &= counter
+                if not carry:
+                    break
+            overflow |= carry
+        result = 0
+        for count in range(missing + 1):
+            mask = self._all & ~overflow
+            for position, counter in enumerate(counters):
+                mask &= counter if count >> position & 1 else ~counter
+            result |= mask
+        return result
+
+    def filter(self, include=(), include_any=(), exclude=(), pantry=None,
+               missing=0):
+        """Отбирает рецепты по ингредиентам.
+
+        Возвращает пару (exclude, ids): при exclude=True ids — рецепты,
+        которые нужно исключить; так выбирается более короткий список.
+        """
+        self.ensure_current()
+        with self._lock:
+            mask = self._all
+            for ingredient_id in include:
+                mask &= self._masks.get(ingredient_id, 0)
+            if include_any:
+                any_mask = 0
+                for ingredient_id in include_any:
+                    any_mask |= self._masks.get(ingredient_id, 0)
+                mask &= any_mask
+            for ingredient_id in exclude:
+                mask &= ~self._masks.get(ingredient_id, 0)
+            if pantry is not None:
+                mask &= self._get_missing_mask(
+                    set(pantry), min(max(missing, 0), MAX_MISSING))
+            rest = self._all & ~mask
+            recipe_ids = self._recipe_ids
+        if bin(mask).count('1') <= bin(rest).count('1'):
+            return False, [
+                recipe_ids[position] for position in get_positions(mask)]
+        return True, [recipe_ids[position] for position in get_positions(rest)]
+
+
+pantry_index = PantryIndex()
@@ -0,0 +1,127 @@
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count
+from django.test import modify_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from recipes.models import Recipe
+
+from .authentication import forget_token
+from .catalog import bump_catalog_version
+from .recipe_cache import ALL_RECIPES
+
+User = get_user_model()
+
+QUERY_BUDGET_MIDDLEWARE = 'api.middleware.QueryBudgetMiddleware'
+QUERY_BUDGETS = {
+    ('GET', 'recipes-list'): 9,
+    ('GET', 'recipes-detail'): 5,
+    ('GET', 'user-list'): 4,
+    ('GET', 'user-detail'): 3,
+    ('GET', 'user-me'): 2,
+    ('GET', 'user-subscriptions'): 5,
+    ('GET', 'tags-list'): 2,
+    ('GET', 'ingredients-list'): 2,
+}
+PAGE_SIZES = (1, 6, 24)
+BUDGET_REQUESTS = (
+    ('recipes-list', {'limit': '{page_size}'}),
+    ('recipes-list', {'limit': '{page_size}', 'is_favorited': '1'}),
+    ('recipes-list', {'limit': '{page_size}', 'is_in_shopping_cart': '1'}),
+    ('user-list', {'limit': '{page_size}'}),
+    ('user-subscriptions', {
+        'limit': '{page_size}', 'recipes_limit': '{page_size}'}),
+    ('user-me', {}),
+    ('tags-list', {}),
+    ('ingredients-list', {'name': 'а'}),
+)
+
+
+def get_budget(method, url_name):
+    """Допустимое число запросов к базе или None, если бюджета нет."""
+    return QUERY_BUDGETS.get((method, url_name))
+
+
+def get_user(username=None):
+    """Активный пользователь с наибольшим числом подписок."""
+    users = User.objects.filter(is_active=True)
+    if username:
+        users = users.filter(username=username)
+    return users.annotate(subscriptions=Count('follower')).order_by(
+        '-subscriptions').first()
+
+
+@contextmanager
+def get_client(user):
+    """Тестовый клиент, авторизованный токеном пользователя.
+
+    Если у пользователя нет токена, он создаётся в транзакции, которая
+    откатывается при выходе, и сбрасывается из кэша аутентификации, так
+    что в базе, в том числе рабочей, после замеров ничего не остаётся.
+    С DatabaseCache каждая запись в кэш внутри этой транзакции
+    добавляет к счёту запросов пару SAVEPOINT и RELEASE.
+    QueryBudgetMiddleware подключается к клиенту и без DEBUG, чтобы
+    ответы несли response.query_stats.
+    """
+    host = next(
+        (host for host in settings.ALLOWED_HOSTS if host not in ('*', '')),
+        'localhost').lstrip('.')
+    client = APIClient(HTTP_HOST=host)
+    with modify_settings(MIDDLEWARE={'prepend': QUERY_BUDGET_MIDDLEWARE}):
+        client.handler.load_middleware()
+    token, created = None, False
+    try:
+        with transaction.atomic():
+            token, created = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+            try:
+                yield client
+            finally:
+                transaction.set_rollback(True)
+    finally:
+        if created:
+            forget_token(token.key)
+
+
+def get_budget_urls(page_size):
+    for url_name, params in BUDGET_REQUESTS:
+        url = reverse(f'api:{url_name}')
+        if params:
+            url += '?' + '&'.join(
+                f'{param}={value.format(page_size=page_size)}'
+                for param, value in params.items())
+        yield url_name, url
+    for url_name, model in (
+            ('recipes-detail', Recipe), ('user-detail', User)):
+        pk = model.objects.values_list('pk', flat=True).first()
+        if pk is not None:
+            yield url_name, reverse(f'api:{url_name}', args=(pk,))
+
+
+def check_budgets(client, page_sizes=PAGE_SIZES):
+    """Запрашивает эндпоинты с разными размерами страницы.
+
+    client — тестовый клиент из get_client. Кэш страниц рецептов
+    сбрасывается перед каждым запросом, чтобы мерить холодный путь.
+    Возвращает строки (url_name, url, запросов, бюджет).
+    """
+    results = []
+    for page_size in page_sizes:
+        for url_name, url in get_budget_urls(page_size):
+            client.get(url)
+            bump_catalog_version(ALL_RECIPES)
+            response = client.get(url)
+            results.append((
+                url_name, url, response.query_stats['queries'],
+                get_budget('GET', url_name)))
+    return results
+
+
+def get_violations(results):
+    return [
+        result for result in results
+        if result[3] is not None and result[2] > result[3]]
@@ -0,0 +1,148 @@
+from hashlib import md5
+
+from django.core.cache import cache
+from django.db import transaction
+from recipes.models import Favorite, Recipe, ShoppingCart, ShortLink, Tag
+
+from .catalog import bump_catalog_version, get_catalog_version
+from .filters import INGREDIENT_PARAMS
+from .pantry_index import PANTRY_CATALOG
+from .recipe_search import SEARCH_CATALOG
+from .serializers.users_serializers import get_subscriptions
+
+LIST_CACHE_TIMEOUT = 5 * 60
+LIST_CACHE_KEY = 'recipes_list_{}'
+USER_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+ALL_RECIPES = 'recipes'
+SHORT_LINK_CODE_KEY = 'short_link_code_{}'
+SHORT_LINK_RECIPE_KEY = 'short_link_recipe_{}'
+
+
+def get_tag_catalog(slug):
+    return f'recipes_tag_{slug}'
+
+
+def get_author_catalog(author_id):
+    return f'recipes_author_{author_id}'
+
+
+def get_list_cache_key(request):
+    """Ключ кэша страницы списка рецептов или None, если её нельзя
+    разделять между пользователями.
+
+    В ключ входят версии только тех срезов, от которых зависит
+    страница: тегов и автора из фильтра или всего списка, а также
+    индексов, по которым она отобрана.
+    """
+    params = request.query_params
+    if any(param in params for param in USER_PARAMS):
+        return None
+    normalized = sorted(
+        (param, sorted(values)) for param, values in params.lists())
+    catalogs = [get_tag_catalog(slug) for slug in params.getlist('tags')]
+    if params.get('author'):
+        catalogs.append(get_author_catalog(params['author']))
+    catalogs = catalogs or [ALL_RECIPES]
+    if params.get('search'):
+        catalogs.append(SEARCH_CATALOG)
+    if any(param in params for param in INGREDIENT_PARAMS):
+        catalogs.append(PANTRY_CATALOG)
+    versions = [
+        get_catalog_version(catalog)
+        for catalog in ('tags', 'ingredients', *catalogs)]
+    key = repr((request.build_absolute_uri(request.path), normalized,
+                versions))
+    return LIST_CACHE_KEY.format(md5(key.encode()).hexdigest())
+
+
+def get_selected_ids(model, user, recipe_ids):
+    """id рецептов из recipe_ids, отмеченных пользователем в model."""
+    if not user.is_authenticated or not recipe_ids:
+        return set()
+    return set(model.objects.filter(
+        user=user, recipe_id__in=recipe_ids).values_list(
+            'recipe_id', flat=True))
+
+
+def get_counters(recipe_ids):
+    """Текущие счётчики рецептов и их авторов по id рецепта."""
+    return {
+        recipe_id: counters for recipe_id, *counters in Recipe.objects.filter(
+            pk__in=recipe_ids).order_by().values_list(
+                'id', 'favorites_count', 'shopping_cart_count',
+                'author__recipes_count', 'author__followers_count')}
+
+
+def apply_counters(data, counters):
+    for recipe in data['results']:
+        if recipe['id'] not in counters:
+            continue
+        (recipe['favorites_count'], recipe['shopping_cart_count'],
+         recipe['author']['recipes_count'],
+         recipe['author']['followers_count']) = counters[recipe['id']]
+    return data
+
+
+def overlay_counters(data):
+    """Обновляет в закэшированной странице счётчики: избранное, корзины
+    и подписки не сбрасывают кэш списков."""
+    return apply_counters(
+        data, get_counters([recipe['id'] for recipe in data['results']]))
+
+
+def apply_user_flags(data, favorited, in_shopping_cart, subscriptions):
+    for recipe in data['results']:
+        recipe['is_favorited'] = recipe['id'] in favorited
+        recipe['is_in_shopping_cart'] = recipe['id'] in in_shopping_cart
+        recipe['author']['is_subscribed'] = (
+            recipe['author']['id'] in subscriptions)
+    return data
+
+
+def overlay_user_flags(data, request):
+    """Проставляет в общей странице флаги текущего пользователя."""
+    ids = [recipe['id'] for recipe in data['results']]
+    return apply_user_flags(
+        data, get_selected_ids(Favorite, request.user, ids),
+        get_selected_ids(ShoppingCart, request.user, ids),
+        get_subscriptions(request))
+
+
+def invalidate_lists(author_ids=(), tag_slugs=()):
+    """Сбрасывает кэш страниц, которые могут содержать изменённые рецепты.
+
+    Версии меняются после фиксации транзакции, чтобы в кэш не попала
+    промежуточная версия рецепта.
+    """
+    catalogs = [
+        ALL_RECIPES, *map(get_tag_catalog, tag_slugs),
+        *map(get_author_catalog, author_ids)]
+
+    def bump():
+        for catalog in catalogs:
+            bump_catalog_version(catalog)
+
+    transaction.on_commit(bump)
+
+
+def invalidate_recipe_lists(recipe_ids):
+    recipes = Recipe.objects.filter(pk__in=recipe_ids)
+    invalidate_lists(
+        set(recipes.values_list('author_id', flat=True)),
+        set(Tag.objects.filter(recipe__in=recipes).values_list(
+            'slug', flat=True)))
+
+
+def invalidate_author_lists(author_id):
+    invalidate_lists((author_id,), set(Tag.objects.filter(
+        recipe__author_id=author_id).values_list('slug', flat=True)))
+
+
+def invalidate_short_link(recipe_id, code=None):
+    """Сбрасывает кэш короткой ссылки рецепта сразу и после фиксации
+    транзакции. Без code сбрасывается код, который выдаёт get-link."""
+    keys = [
+        SHORT_LINK_RECIPE_KEY.format(recipe_id),
+        SHORT_LINK_CODE_KEY.format(code or ShortLink.make_code(recipe_id))]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,128 @@
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from math import log
+
+from recipes.models import IngredientAmount, Recipe
+
+from .catalog import VersionedIndex
+from .stemmer import stem
+
+SEARCH_CATALOG = 'recipe_search'
+SEARCH_RESULTS_LIMIT = 1000
+MIN_TOKEN_LENGTH = 2
+TOKEN_PATTERN = re.compile(r'\w+')
+STOP_WORDS = frozenset(
+    'а в во да для до же за и из или к как на не но о об от по при с со '
+    'то у'.split())
+FIELD_WEIGHTS = {'name': 3, 'tags': 2, 'ingredients': 2, 'text': 1}
+
+
+def tokenize(text):
+    return [
+        stem(word) for word in TOKEN_PATTERN.findall(text.lower())
+        if len(word) >= MIN_TOKEN_LENGTH and word not in STOP_WORDS]
+
+
+class RecipeSearchIndex(VersionedIndex):
+    """Инвертированный индекс рецептов для полнотекстового поиска."""
+
+    catalog = SEARCH_CATALOG
+
+    def _reset(self):
+        self._postings = {}
+        self._documents = {}
+        self._terms = []
+
+    @property
+    def stats(self):
+        """Количество рецептов и слов в индексе."""
+        return len(self._documents), len(self._terms)
+
+    def get_documents(self, recipe_ids=None):
+        recipes = Recipe.objects.all()
+        tags = Recipe.tags.through.objects.all()
+        ingredients = IngredientAmount.objects.all()
+        if recipe_ids is not None:
+            recipes = recipes.filter(pk__in=recipe_ids)
+            tags = tags.filter(recipe_id__in=recipe_ids)
+            ingredients = ingredients.filter(recipe_id__in=recipe_ids)
+        documents = {
+            recipe_id: {'name': name, 'text': text, 'tags': [],
+                        'ingredients': []}
+            for recipe_id, name, text in recipes.values_list(
+                'id', 'name', 'text').iterator()}
+        for field, rows in (
+                ('tags', tags.values_list('recipe_id', 'tag__name')),
+                ('ingredients', ingredients.values_list(
+                    'recipe_id', 'ingredient__name'))):
+            for recipe_id, name in rows.iterator():
+                if recipe_id in documents:
+                    documents[recipe_id][field].append(name)
+        return documents
+
+    def _add(self, recipe_id, document):
+        weights = defaultdict(int)
+        for field, weight in FIELD_WEIGHTS.items():
+            values = document[field]
+            if isinstance(values, str):
+                values = (values,)
+            for value in values:
+                for term in tokenize(value):
+                    weights[term] += weight
+        for term, weight in weights.items():
+            if term not in self._postings:
+                self._postings[term] = {}
+                insort(self._terms, term)
+            self._postings[term][recipe_id] = weight
+        self._documents[recipe_id] = set(weights)
+
+    def _remove(self, recipe_id):
+        for term in self._documents.pop(recipe_id, ()):
+            postings = self._postings[term]
+            del postings[recipe_id]
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+    def _match(self, term, prefix):
+        if not prefix:
+            return self._postings.get(term, {})
+        matches = defaultdict(int)
+        position = bisect_left(self._terms, term)
+        while (position < len(self._terms)
+               and self._terms[position].startswith(term)):
+            for recipe_id, weight in self._postings[
+                    self._terms[position]].items():
+                matches[recipe_id] = max(matches[recipe_id], weight)
+            position += 1
+        return matches
+
+    def search(self, query, limit=SEARCH_RESULTS_LIMIT):
+        """id рецептов, содержащих все слова запроса, по убыванию
+        релевантности; последнее слово ищется и как префикс."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        self.ensure_current()
+        with self._lock:
+            total = len(self._documents) or 1
+            scores = None
+            for position, term in enumerate(terms):
+                matches = self._match(term, position == len(terms) - 1)
+                idf = log(1 + total / (len(matches) or 1))
+                if scores is None:
+                    scores = {
+                        recipe_id: weight * idf
+                        for recipe_id, weight in matches.items()}
+                else:
+                    scores = {
+                        recipe_id: score + matches[recipe_id] * idf
+                        for recipe_id, score in scores.items()
+                        if recipe_id in matches}
+        return sorted(
+            scores, key=lambda recipe_id: (-scores[recipe_id], -recipe_id)
+        )[:limit]
+
+
+recipe_search_index = RecipeSearchIndex()
@@ -0,0 +1,104 @@
+import base64
+import binascii
+import hashlib
+import os
+from urllib.parse import urlparse
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64FieldMixin, Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+from recipes.constants import IMAGE_MAX_PIXELS, IMAGE_MAX_SIZE
+from recipes.images import get_variant_names
+
+IMAGE_TOO_LARGE_MESSAGE = (
+    f'Размер изображения больше {IMAGE_MAX_SIZE // 1024 // 1024} МБ.')
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные варианты изображения."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        variants = {}
+        for variant, name in get_variant_names(value.name).items():
+            url = default_storage.url(name)
+            variants[variant] = (
+                request.build_absolute_uri(url) if request else url)
+        return variants
+
+
+class StoredImageField(Base64ImageField):
+    """Изображение в base64, файлом multipart/form-data или ссылкой на
+    уже сохранённое.
+
+    Если клиент прислал адрес текущего изображения или те же байты
+    (имя файла в хранилище — sha256 содержимого), возвращается
+    сохранённый файл без проверки Pillow и записи на диск. Размер и
+    разрешение проверяются до полной проверки изображения.
+    """
+
+    def get_current_file(self):
+        instance = getattr(self.parent, 'instance', None)
+        if instance is None:
+            return None
+        return getattr(instance, self.source, None) or None
+
+    def is_current(self, current, content_hash):
+        stored_hash = os.path.splitext(os.path.basename(current.name))[0]
+        return content_hash == stored_hash
+
+    def check_limits(self, file):
+        if file.size > IMAGE_MAX_SIZE:
+            raise serializers.ValidationError(IMAGE_TOO_LARGE_MESSAGE)
+        try:
+            with Image.open(file) as image:
+                width, height = image.size
+        except (OSError, ValueError, Image.DecompressionBombError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        finally:
+            file.seek(0)
+        if width * height > IMAGE_MAX_PIXELS:
+            raise serializers.ValidationError(
+                f'Изображение больше {IMAGE_MAX_PIXELS} пикселей.')
+
+    def to_file(self, file):
+        self.check_limits(file)
+        return super(Base64FieldMixin, self).to_internal_value(file)
+
+    def to_internal_value(self, data):
+        current = self.get_current_file()
+        if isinstance(data, UploadedFile):
+            if current is not None:
+                hasher = hashlib.sha256()
+                for chunk in data.chunks():
+                    hasher.update(chunk)
+                data.seek(0)
+                if self.is_current(current, hasher.hexdigest()):
+                    return current
+            return self.to_file(data)
+        if not isinstance(data, str) or data in self.EMPTY_VALUES:
+            return super().to_internal_value(data)
+        if current is not None and (
+                urlparse(data).path == urlparse(current.url).path):
+            return current
+        base64_data = data.split(';base64,')[-1]
+        if len(base64_data) * 3 // 4 > IMAGE_MAX_SIZE:
+            raise serializers.ValidationError(IMAGE_TOO_LARGE_MESSAGE)
+        try:
+            decoded_file = base64.b64decode(base64_data)
+        except (TypeError, binascii.Error, ValueError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        if current is not None and self.is_current(
+                current, hashlib.sha256(decoded_file).hexdigest()):
+            return current
+        file_name = self.get_file_name(decoded_file)
+        file_extension = self.get_file_extension(file_name, decoded_file)
+        if file_extension not in self.ALLOWED_TYPES:
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        return self.to_file(ContentFile(
+            decoded_file, name=f'{file_name}.{file_extension}'))
@@ -1,11 +1,12 @@
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
-from recipes.models import (
-    IngredientAmount, Ingredient, Favorite, Recipe, ShoppingCart, Tag)
+from recipes.models import IngredientAmount, Ingredient, Recipe, Tag
 
+from ..signals import refresh_recipe
+from .fields import ImageVariantsField, StoredImageField
 from .users_serializers import UserSerializer
 
 User = get_user_model()
@@ -57,7 +58,7 @@ class RecipeRequestSerializer(serializers.ModelSerializer):
         child=serializers.IntegerField(), allow_empty=False)
     ingredients = IngredientAmountReadSerializer(
         many=True, required=True, allow_empty=False)
-    image = Base64ImageField(required=True, allow_null=False)
+    image = StoredImageField(required=True, allow_null=False)
 
     class Meta:
         model = Recipe
@@ -98,6 +99,7 @@ class RecipeRequestSerializer(serializers.ModelSerializer):
             amount=ingredient.get('amount')) for ingredient in ingredients]
         IngredientAmount.objects.bulk_create(ingredients_list)
 
+    @transaction.atomic
     def create(self, validated_data):
         image = validated_data.pop('image')
         ingredients = validated_data.pop('ingredients')
@@ -108,17 +110,60 @@ class RecipeRequestSerializer(serializers.ModelSerializer):
         self.create_ingredients(ingredients, recipe)
         return recipe
 
+    def update_tags(self, instance, tags):
+        current = {tag.id for tag in instance.tags.all()}
+        tags = set(tags)
+        if current - tags:
+            instance.tags.remove(*(current - tags))
+        if tags - current:
+            instance.tags.add(*(tags - current))
+
+    def update_ingredients(self, instance, ingredients):
+        """Меняет только отличающиеся строки; возвращает True, если
+        были записи без сигналов."""
+        current = {
+            amount.ingredient_id: amount
+            for amount in instance.ingredients_amounts.all()}
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients}
+        removed = [
+            current[ingredient_id].id for ingredient_id in current
+            if ingredient_id not in amounts]
+        changed = []
+        for ingredient_id, amount in amounts.items():
+            if ingredient_id in current and (
+                    current[ingredient_id].amount != amount):
+                current[ingredient_id].amount = amount
+                changed.append(current[ingredient_id])
+        added = [
+            ingredient for ingredient in ingredients
+            if ingredient['id'] not in current]
+        if removed:
+            IngredientAmount.objects.filter(pk__in=removed).delete()
+        if changed:
+            IngredientAmount.objects.bulk_update(changed, ('amount',))
+        if added:
+            self.create_ingredients(added, instance)
+        return bool(changed or added)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.image = validated_data.get('image', instance.image)
-        instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get(
-            'cooking_time', instance.cooking_time)
-        instance.tags.clear()
-        instance.tags.set(validated_data.get('tags'))
-        instance.ingredients_amounts.all().delete()
-        self.create_ingredients(validated_data.get('ingredients'), instance)
-        instance.save()
+        """Записывает только изменённые поля и связи рецепта."""
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        update_fields = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value]
+        for field in update_fields:
+            setattr(instance, field, validated_data[field])
+        if update_fields:
+            instance.save(update_fields=update_fields)
+        if tags is not None:
+            self.update_tags(instance, tags)
+        if ingredients is not None and self.update_ingredients(
+                instance, ingredients) and not update_fields:
+            refresh_recipe(instance.pk)
         return instance
 
 
@@ -129,25 +174,14 @@ class RecipeResponseSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     ingredients = IngredientAmountSerializer(
         source='ingredients_amounts', many=True, read_only=True)
-    is_in_shopping_cart = serializers.SerializerMethodField()
-    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.BooleanField(read_only=True)
+    is_favorited = serializers.BooleanField(read_only=True)
     image = Base64ImageField(required=True, allow_null=False)
+    image_variants = ImageVariantsField(source='image')
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text',
-            'cooking_time')
-
-    def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        return ShoppingCart.objects.filter(
-            user_id=user.id, recipe=get_object_or_404(
-                Recipe, id=obj.id)).exists()
-
-    def get_is_favorited(self, obj):
-        user = self.context['request'].user
-        return Favorite.objects.filter(
-            user_id=user.id, recipe=get_object_or_404(
-                Recipe, id=obj.id)).exists()
+            'is_in_shopping_cart', 'name', 'image', 'image_variants', 'text',
+            'cooking_time', 'favorites_count', 'shopping_cart_count')
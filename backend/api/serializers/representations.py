@@ -0,0 +1,157 @@
+"""Представления горячих эндпоинтов чтения без ModelSerializer.
+
+Ответы собираются из строк .values() в обычные словари; результат
+совпадает с выводом соответствующих сериализаторов.
+"""
+
+from django.core.files.storage import default_storage
+from recipes.images import get_variant_names
+from recipes.models import IngredientAmount, Tag
+
+from .users_serializers import get_subscriptions
+
+USER_FIELDS = (
+    'username', 'email', 'first_name', 'last_name', 'id', 'avatar',
+    'recipes_count', 'followers_count')
+AUTHOR_FIELDS = tuple(f'author__{field}' for field in USER_FIELDS)
+RECIPE_FIELDS = (
+    'id', 'name', 'image', 'text', 'cooking_time', 'favorites_count',
+    'shopping_cart_count', 'is_favorited', 'is_in_shopping_cart',
+    'created_at', *AUTHOR_FIELDS)
+
+
+class ImageUrls:
+    """Ссылки на изображение и его варианты, как у Base64ImageField и
+    ImageVariantsField; ссылка на каждый файл строится один раз."""
+
+    def __init__(self, request=None):
+        self.request = request
+        self._urls = {}
+
+    def get_url(self, name):
+        url = self._urls.get(name)
+        if url is None:
+            url = default_storage.url(name)
+            if self.request is not None:
+                url = self.request.build_absolute_uri(url)
+            self._urls[name] = url
+        return url
+
+    def get_image(self, name):
+        return self.get_url(name) if name else None
+
+    def get_variants(self, name):
+        if not name:
+            return None
+        return {
+            variant: self.get_url(variant_name)
+            for variant, variant_name in get_variant_names(name).items()}
+
+
+def get_recipe_rows(queryset):
+    return queryset.prefetch_related(None).values(*RECIPE_FIELDS)
+
+
+def group_rows(rows, make_item):
+    """Группирует строки по первому значению, сохраняя их порядок."""
+    groups = {}
+    for recipe_id, *values in rows:
+        groups.setdefault(recipe_id, []).append(make_item(*values))
+    return groups
+
+
+def get_recipe_tags(recipe_ids):
+    """Теги рецептов в порядке prefetch_related('tags')."""
+    return group_rows(
+        Tag.objects.filter(recipe__in=recipe_ids).values_list(
+            'recipe', 'id', 'name', 'slug'),
+        lambda pk, name, slug: {'id': pk, 'name': name, 'slug': slug})
+
+
+def get_recipe_ingredients(recipe_ids):
+    """Ингредиенты рецептов как у IngredientAmountSerializer."""
+    return group_rows(
+        IngredientAmount.objects.filter(recipe_id__in=recipe_ids).values_list(
+            'recipe_id', 'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'),
+        lambda pk, name, measurement_unit, amount: {
+            'id': pk, 'name': name, 'measurement_unit': measurement_unit,
+            'amount': amount})
+
+
+def get_author_recipes(recipes, author_ids):
+    """Короткие рецепты авторов в порядке prefetch_related."""
+    return group_rows(
+        recipes.filter(author_id__in=author_ids).values_list(
+            'author_id', 'id', 'image', 'name', 'cooking_time'),
+        lambda *values: values)
+
+
+def represent_user(row, subscriptions, urls, prefix=''):
+    """Как UserSerializer; prefix — префикс полей пользователя в строке."""
+    avatar = row[f'{prefix}avatar']
+    return {
+        'username': row[f'{prefix}username'],
+        'email': row[f'{prefix}email'],
+        'first_name': row[f'{prefix}first_name'],
+        'last_name': row[f'{prefix}last_name'],
+        'id': row[f'{prefix}id'],
+        'is_subscribed': row[f'{prefix}id'] in subscriptions,
+        'avatar': urls.get_image(avatar),
+        'avatar_variants': urls.get_variants(avatar),
+        'recipes_count': row[f'{prefix}recipes_count'],
+        'followers_count': row[f'{prefix}followers_count'],
+    }
+
+
+def represent_users(rows, request):
+    subscriptions = get_subscriptions(request)
+    urls = ImageUrls(request)
+    return [represent_user(row, subscriptions, urls) for row in rows]
+
+
+def represent_recipes(rows, tags, ingredients, request):
+    """Как RecipeResponseSerializer для строк get_recipe_rows."""
+    subscriptions = get_subscriptions(request)
+    urls = ImageUrls(request)
+    return [{
+        'id': row['id'],
+        'tags': tags.get(row['id'], []),
+        'author': represent_user(row, subscriptions, urls, 'author__'),
+        'ingredients': ingredients.get(row['id'], []),
+        'is_favorited': bool(row['is_favorited']),
+        'is_in_shopping_cart': bool(row['is_in_shopping_cart']),
+        'name': row['name'],
+        'image': urls.get_image(row['image']),
+        'image_variants': urls.get_variants(row['image']),
+        'text': row['text'],
+        'cooking_time': row['cooking_time'],
+        'favorites_count': row['favorites_count'],
+        'shopping_cart_count': row['shopping_cart_count'],
+    } for row in rows]
+
+
+def represent_subscriptions(rows, recipes, request):
+    """Как FollowSerializer; рецепты, как и там, со ссылками без хоста."""
+    subscriptions = get_subscriptions(request)
+    urls = ImageUrls(request)
+    recipe_urls = ImageUrls()
+    return [{
+        'id': row['id'],
+        'email': row['email'],
+        'username': row['username'],
+        'first_name': row['first_name'],
+        'last_name': row['last_name'],
+        'avatar': urls.get_image(row['avatar']),
+        'avatar_variants': urls.get_variants(row['avatar']),
+        'is_subscribed': row['id'] in subscriptions,
+        'recipes': [{
+            'id': pk,
+            'image': recipe_urls.get_image(image),
+            'image_variants': recipe_urls.get_variants(image),
+            'name': name,
+            'cooking_time': cooking_time,
+        } for pk, image, name, cooking_time in recipes.get(row['id'], ())],
+        'recipes_count': row['recipes_count'],
+        'followers_count': row['followers_count'],
+    } for row in rows]
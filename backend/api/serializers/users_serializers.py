@@ -1,5 +1,4 @@
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
@@ -8,7 +7,23 @@ from rest_framework.validators import UniqueValidator
 from recipes.models import Favorite, ShoppingCart
 from users.models import Follow
 
+from .fields import ImageVariantsField, StoredImageField
+
 User = get_user_model()
+BULK_MAX_ITEMS = 100
+
+
+def get_subscriptions(request):
+    """Множество id авторов, на которых подписан пользователь запроса.
+
+    Загружается один раз и переиспользуется всеми сериализаторами ответа.
+    """
+    if not hasattr(request, '_subscriptions'):
+        user = request.user
+        request._subscriptions = set(
+            user.follower.values_list('following_id', flat=True)
+        ) if user.is_authenticated else set()
+    return request._subscriptions
 
 
 class CreateQuerysetObjMixin:
@@ -24,6 +39,14 @@ class CreateQuerysetObjMixin:
             {'errors': 'Уже существует.'}, code='dublicate_errors')
 
 
+class BulkIdsSerializer(serializers.Serializer):
+    """Сериализатор для списка id в массовых операциях."""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False,
+        max_length=BULK_MAX_ITEMS)
+
+
 class RegistrationSerializer(UserCreateSerializer):
     """Сериализатор для регистрации пользователей."""
 
@@ -44,29 +67,36 @@ class UserSerializer(UserSerializer):
     """Сериализатор для пользователей."""
 
     avatar = Base64ImageField(required=False, allow_null=True)
+    avatar_variants = ImageVariantsField(source='avatar')
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = (
             'username', 'email', 'first_name',
-            'last_name', 'id', 'is_subscribed', 'avatar')
+            'last_name', 'id', 'is_subscribed', 'avatar', 'avatar_variants',
+            'recipes_count', 'followers_count')
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        return user.is_authenticated and user.follower.filter(
-            following=get_object_or_404(User, id=obj.id)).exists()
+        return obj.id in get_subscriptions(self.context['request'])
 
 
 class AvatarSerializer(serializers.ModelSerializer):
     """Сериализатор для аватаров."""
 
-    avatar = Base64ImageField()
+    avatar = StoredImageField()
 
     class Meta:
         model = User
         fields = ('avatar',)
 
+    def update(self, instance, validated_data):
+        if instance.avatar == validated_data['avatar']:
+            return instance
+        instance.avatar = validated_data['avatar']
+        instance.save(update_fields=('avatar',))
+        return instance
+
 
 class RecipeShortBaseSerializer(serializers.Serializer,
                                 CreateQuerysetObjMixin):
@@ -74,6 +104,7 @@ class RecipeShortBaseSerializer(serializers.Serializer,
 
     id = serializers.IntegerField(read_only=True)
     image = Base64ImageField(required=False, allow_null=True)
+    image_variants = ImageVariantsField(source='image')
     name = serializers.CharField(read_only=True)
     cooking_time = serializers.IntegerField(read_only=True)
 
@@ -100,27 +131,23 @@ class FollowSerializer(UserSerializer, CreateQuerysetObjMixin):
     """Сериализатор для подписок."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = (
             'id', 'email', 'username', 'first_name', 'last_name',
-            'avatar', 'is_subscribed', 'recipes', 'recipes_count')
+            'avatar', 'avatar_variants', 'is_subscribed', 'recipes',
+            'recipes_count', 'followers_count')
         read_only_fields = (
             'id', 'email', 'username', 'first_name', 'last_name', 'avatar')
 
     def create(self, validated_data):
-        return self.create_queryset_obj(
+        following = self.create_queryset_obj(
             'following', validated_data.pop('select_object'),
             Follow.objects.all())
+        following.refresh_from_db(fields=('followers_count',))
+        return following
 
     def get_recipes(self, obj):
-        queryset = obj.recipe_set.all()
-        recipes_limit = self.context['request'].GET.get('recipes_limit')
-        if recipes_limit:
-            queryset = queryset[:int(recipes_limit)]
-        return RecipeShortBaseSerializer(queryset, many=True).data
-
-    def get_recipes_count(self, obj):
-        return obj.recipe_set.all().count()
+        return RecipeShortBaseSerializer(
+            obj.subscription_recipes, many=True).data
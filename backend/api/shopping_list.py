@@ -0,0 +1,66 @@
+import csv
+import json
+from itertools import islice
+
+from django.db.models import Sum
+from recipes.models import IngredientAmount
+
+CHUNK_SIZE = 500
+
+
+class EchoBuffer:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def get_ingredients(user):
+    """Суммы ингредиентов из корзины, читаемые курсором порциями."""
+    return IngredientAmount.objects.filter(
+        recipe__customer__user=user).values_list(
+            'ingredient__name', 'ingredient__measurement_unit').annotate(
+                total=Sum('amount')).order_by(
+                    'ingredient__name').iterator(chunk_size=CHUNK_SIZE)
+
+
+def render_txt(rows):
+    yield 'Список покупок:\n\n'
+    for number, (name, measurement_unit, amount) in enumerate(rows, start=1):
+        yield f'{number}) {name} - {amount} {measurement_unit}\n'
+
+
+def render_csv(rows):
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for name, measurement_unit, amount in rows:
+        yield writer.writerow((name, amount, measurement_unit))
+
+
+def render_json(rows):
+    separator = '['
+    for name, measurement_unit, amount in rows:
+        yield separator + json.dumps(
+            {'name': name, 'amount': amount,
+             'measurement_unit': measurement_unit},
+            ensure_ascii=False)
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+FORMATS = {
+    'txt': ('text/plain', render_txt),
+    'csv': ('text/csv', render_csv),
+    'json': ('application/json', render_json),
+}
+
+
+def stream_shopping_list(user, file_format):
+    """Список покупок частями по CHUNK_SIZE строк."""
+    _, render = FORMATS[file_format]
+    lines = render(get_ingredients(user))
+    while True:
+        chunk = ''.join(islice(lines, CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk.encode()
@@ -0,0 +1,161 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from recipes.counters import COUNTERS, change_counters
+from recipes.images import create_variants
+from recipes.models import (
+    Favorite, Ingredient, IngredientAmount, Recipe, ShoppingCart, ShortLink,
+    Tag)
+from users.models import Follow
+
+from .authentication import invalidate_token, invalidate_user
+from .catalog import bump_catalog_version
+from .pantry_index import pantry_index
+from .recipe_cache import (
+    invalidate_author_lists, invalidate_lists, invalidate_recipe_lists,
+    invalidate_short_link)
+from .recipe_search import recipe_search_index
+
+User = get_user_model()
+
+
+def invalidate_counter_owners(sender, instance):
+    """Сбрасывает кэш аутентификации пользователей, чьи счётчики
+    изменились из-за записи sender."""
+    for model, _, source, foreign_key in COUNTERS:
+        if model is User and source is sender:
+            invalidate_user(getattr(instance, f'{foreign_key}_id'))
+
+
+def refresh_recipe(recipe_id):
+    """Сбрасывает кэш списков и индексы рецепта после массовых записей
+    его ингредиентов, для которых сигналы не отправляются."""
+    invalidate_recipe_lists((recipe_id,))
+    recipe_search_index.schedule_update((recipe_id,))
+    pantry_index.schedule_update((recipe_id,))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredients_version(**kwargs):
+    bump_catalog_version('ingredients')
+    recipe_search_index.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tags_version(**kwargs):
+    bump_catalog_version('tags')
+    recipe_search_index.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+def make_recipe_image_variants(instance, **kwargs):
+    create_variants(instance.image.name)
+
+
+@receiver(post_save, sender=User)
+def make_avatar_variants(instance, update_fields=None, **kwargs):
+    if update_fields is None or 'avatar' in update_fields:
+        create_variants(instance.avatar.name)
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_saved_recipe(instance, created, **kwargs):
+    if created:
+        invalidate_lists((instance.author_id,))
+    else:
+        invalidate_recipe_lists((instance.pk,))
+
+
+@receiver(pre_delete, sender=Recipe)
+def invalidate_deleted_recipe(instance, **kwargs):
+    invalidate_recipe_lists((instance.pk,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            invalidate_lists(tag_slugs=(instance.slug,))
+        else:
+            invalidate_recipe_lists((instance.pk,))
+    elif action in ('post_add', 'post_remove'):
+        if reverse:
+            invalidate_lists(tag_slugs=(instance.slug,))
+            invalidate_recipe_lists(pk_set)
+        else:
+            invalidate_lists((instance.author_id,), Tag.objects.filter(
+                pk__in=pk_set).values_list('slug', flat=True))
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_short_link(instance, **kwargs):
+    invalidate_short_link(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=ShortLink)
+def invalidate_changed_short_link(instance, **kwargs):
+    invalidate_short_link(instance.recipe_id, instance.code)
+
+
+@receiver((post_save, post_delete), sender=IngredientAmount)
+def invalidate_recipe_ingredients(instance, **kwargs):
+    invalidate_recipe_lists((instance.recipe_id,))
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(instance, created, update_fields=None, **kwargs):
+    if not created and update_fields != frozenset(('last_login',)):
+        invalidate_author_lists(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def reindex_recipe(instance, **kwargs):
+    recipe_search_index.schedule_update((instance.pk,))
+    pantry_index.schedule_update((instance.pk,))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def reindex_recipe_tags(instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        recipe_search_index.invalidate()
+    else:
+        recipe_search_index.schedule_update((instance.pk,))
+
+
+@receiver((post_save, post_delete), sender=IngredientAmount)
+def reindex_recipe_ingredients(instance, **kwargs):
+    recipe_search_index.schedule_update((instance.recipe_id,))
+    pantry_index.schedule_update((instance.recipe_id,))
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+@receiver(post_save, sender=Recipe)
+def increment_counters(sender, instance, created, **kwargs):
+    if created:
+        change_counters(sender, instance, 1)
+        invalidate_counter_owners(sender, instance)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Follow)
+@receiver(post_delete, sender=Recipe)
+def decrement_counters(sender, instance, **kwargs):
+    change_counters(sender, instance, -1)
+    invalidate_counter_owners(sender, instance)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_cached_user(instance, **kwargs):
+    invalidate_user(instance.pk)
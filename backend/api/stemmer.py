@@ -0,0 +1,81 @@
+"""Упрощённый стеммер Портера (Snowball) для русского языка."""
+
+VOWELS = frozenset('аеиоуыэюя')
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'))
+REFLEXIVE = ((), ('ся', 'сь'))
+ADJECTIVE = ((), (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею'))
+PARTICIPLE = (('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'))
+NOUN = ((), (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+    'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+    'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+    'ья', 'я'))
+SUPERLATIVE = ((), ('ейше', 'ейш'))
+DERIVATIONAL = ((), ('ость', 'ост'))
+
+
+def get_region(word, start=0):
+    """Часть слова после первой согласной, идущей за гласной."""
+    for position in range(start + 1, len(word)):
+        if word[position] not in VOWELS and word[position - 1] in VOWELS:
+            return position + 1
+    return len(word)
+
+
+def strip_suffix(word, start, groups):
+    """Отрезает самое длинное окончание из групп, если оно внутри
+    региона; окончания первой группы — только после «а» или «я»."""
+    preceded, plain = groups
+    candidates = [(suffix, True) for suffix in preceded] + [
+        (suffix, False) for suffix in plain]
+    for suffix, needs_vowel in sorted(
+            candidates, key=lambda item: -len(item[0])):
+        if not word.endswith(suffix) or len(word) - len(suffix) < start:
+            continue
+        stem = word[:-len(suffix)]
+        if needs_vowel and not stem.endswith(('а', 'я')):
+            continue
+        return stem
+    return None
+
+
+def stem(word):
+    word = word.replace('ё', 'е')
+    rv = next(
+        (position + 1 for position, letter in enumerate(word)
+         if letter in VOWELS), len(word))
+    r2 = get_region(word, get_region(word))
+
+    stemmed = strip_suffix(word, rv, PERFECTIVE_GERUND)
+    if stemmed is None:
+        word = strip_suffix(word, rv, REFLEXIVE) or word
+        stemmed = strip_suffix(word, rv, ADJECTIVE)
+        if stemmed is not None:
+            stemmed = strip_suffix(stemmed, rv, PARTICIPLE) or stemmed
+        else:
+            stemmed = (
+                strip_suffix(word, rv, VERB)
+                or strip_suffix(word, rv, NOUN))
+    word = stemmed if stemmed is not None else word
+
+    if word.endswith('и') and len(word) - 1 >= rv:
+        word = word[:-1]
+    word = strip_suffix(word, r2, DERIVATIONAL) or word
+    word = strip_suffix(word, rv, SUPERLATIVE) or word
+    if word.endswith('нн') and len(word) - 1 >= rv:
+        return word[:-1]
+    if word.endswith('ь') and len(word) - 1 >= rv:
+        return word[:-1]
+    return word
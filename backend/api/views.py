@@ -1,36 +1,74 @@
-import pyshorteners
-from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import IntegrityError
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Prefetch, Subquery
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers)
+from django.utils.http import http_date
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import filters, permissions, status
+from rest_framework import permissions, serializers, status
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.viewsets import (
     ModelViewSet, ViewSetMixin, ReadOnlyModelViewSet)
-from recipes.models import Ingredient, Favorite, Recipe, ShoppingCart, Tag
+from recipes.counters import refresh_counters
+from recipes.models import (
+    Ingredient, Favorite, Recipe, ShoppingCart, ShortLink, Tag)
 from users.models import Follow
 
-from .filters import IngredientFilter, RecipeFilter
+from .async_views import (
+    AsyncReadMixin, gather_queries, is_asgi_request, run_in_thread)
+from .authentication import invalidate_user
+from .catalog import get_catalog_version
+from .filters import RecipeFilter, RecipeSearchFilter
+from .ingredient_index import SEARCH_LIMIT, ingredient_index
 from .pagination import LimitPageNumberPagination
 from .permissions import IsAuthorOrReadOnly
+from .renderers import FastJSONRenderer
+from .recipe_cache import (
+    LIST_CACHE_TIMEOUT, SHORT_LINK_CODE_KEY, SHORT_LINK_RECIPE_KEY,
+    apply_counters, apply_user_flags, get_counters, get_list_cache_key,
+    get_selected_ids, overlay_counters, overlay_user_flags)
 from .serializers.recipes_serializers import (
     IngredientSerializer, RecipeRequestSerializer,
     RecipeResponseSerializer, TagSerializer)
+from .serializers.representations import (
+    USER_FIELDS, get_author_recipes, get_recipe_ingredients, get_recipe_rows,
+    get_recipe_tags, represent_recipes, represent_subscriptions,
+    represent_users)
 from .serializers.users_serializers import (
-    AvatarSerializer, FollowSerializer,
+    AvatarSerializer, BulkIdsSerializer, FollowSerializer,
     RecipeShortFavoriteSerializer, RecipeShortShoppingCartSerializer,
-    UserSerializer)
+    UserSerializer, get_subscriptions)
+from .shopping_list import FORMATS, stream_shopping_list
 
 User = get_user_model()
 
+RECIPES_LIMIT_MAX = 100
+
+
+def short_link_redirect(request, code):
+    """Переход по короткой ссылке на страницу рецепта."""
+    cache_key = SHORT_LINK_CODE_KEY.format(code)
+    recipe_id = cache.get(cache_key)
+    if recipe_id is None:
+        recipe_id = get_object_or_404(
+            ShortLink.objects.values_list('recipe_id', flat=True), code=code)
+        cache.set(cache_key, recipe_id)
+    return redirect(f'/recipes/{recipe_id}')
+
 
 class SelectObjectMixin(ViewSetMixin):
     """"Добавление/удаление в queryset."""
 
+    @transaction.atomic
     def add_delete_to_queryset(self, queryset, name_object, request):
         user = request.user
         select_object = self.get_object()
@@ -45,25 +83,224 @@ class SelectObjectMixin(ViewSetMixin):
         serializer.save(select_object=select_object)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
+    def bulk_add_delete(self, model, name_object, targets, request):
+        """Добавление/удаление списка объектов одним запросом.
+
+        Новые записи вставляются одним bulk_create, удаляются одним
+        DELETE; для каждого id возвращается результат операции.
+        """
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        user = request.user
+        field = f'{name_object}_id'
+        found = set(targets.filter(pk__in=ids).values_list('pk', flat=True))
+        selected = model.objects.filter(user=user, **{f'{field}__in': ids})
+        existing = set(selected.values_list(field, flat=True))
+        if request.method == 'DELETE':
+            if existing:
+                selected.delete()
+            results = {
+                pk: 'deleted' if pk in existing else (
+                    'absent' if pk in found else 'not_found')
+                for pk in ids}
+        else:
+            results = {
+                pk: 'exists' if pk in existing else (
+                    'created' if pk in found else 'not_found')
+                for pk in ids}
+            if name_object == 'following' and results.get(user.pk) == (
+                    'created'):
+                results[user.pk] = 'invalid'
+            created = self.insert_selected(
+                model, field, user, selected, results)
+            refresh_counters(model, created)
+            if model is Follow:
+                for pk in created:
+                    invalidate_user(pk)
+        return Response({'results': [
+            {'id': pk, 'result': result} for pk, result in results.items()]})
+
+    @staticmethod
+    def insert_selected(model, field, user, selected, results):
+        """Вставляет записи со статусом created и возвращает их id.
+
+        Если параллельный запрос успел вставить часть записей, вставка
+        откатывается до точки сохранения, такие записи получают статус
+        exists, а остальные вставляются заново.
+        """
+        created = [
+            pk for pk, result in results.items() if result == 'created']
+        while created:
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create(
+                        [model(user=user, **{field: pk}) for pk in created])
+                return created
+            except IntegrityError:
+                existing = set(selected.values_list(field, flat=True))
+                if existing.isdisjoint(created):
+                    raise
+            for pk in existing.intersection(created):
+                results[pk] = 'exists'
+            created = [pk for pk in created if pk not in existing]
+        return created
+
+
+class CatalogConditionalMixin(AsyncReadMixin, ViewSetMixin):
+    """Условные GET-запросы к справочнику по его версии.
+
+    Если у клиента актуальная версия, отдаётся 304 с теми же ETag и
+    Last-Modified без запросов к справочнику. Версия берётся из кэша:
+    без Memcached (с DatabaseCache) это один запрос к таблице кэша.
+    """
 
-class RecipeViewSet(ModelViewSet, SelectObjectMixin):
+    catalog = None
+
+    def get_catalog_validators(self):
+        version = get_catalog_version(self.catalog)
+        return f'"{self.catalog}-{version}"', version // 10 ** 9
+
+    def get_not_modified_response(self, request, etag, last_modified):
+        if request.method in ('GET', 'HEAD'):
+            return get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+        return None
+
+    def set_catalog_headers(self, response, etag, last_modified):
+        if response.status_code in (
+                status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, no_cache=True)
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        etag, last_modified = self.get_catalog_validators()
+        response = self.get_not_modified_response(
+            request, etag, last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        return self.set_catalog_headers(response, etag, last_modified)
+
+    async def async_dispatch(self, request, *args, **kwargs):
+        etag, last_modified = await run_in_thread(
+            request, self.get_catalog_validators)
+        response = self.get_not_modified_response(
+            request, etag, last_modified)
+        if response is None:
+            response = await super().async_dispatch(request, *args, **kwargs)
+        return self.set_catalog_headers(response, etag, last_modified)
+
+
+class RecipeViewSet(AsyncReadMixin, ModelViewSet, SelectObjectMixin):
     """Вьюсет для рецептов."""
 
-    queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrReadOnly,)
     pagination_class = LimitPageNumberPagination
-    filter_backends = (filters.SearchFilter, DjangoFilterBackend)
+    filter_backends = (RecipeSearchFilter, DjangoFilterBackend)
     filterset_class = RecipeFilter
     serializer_class = RecipeResponseSerializer
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    keyset_ordering = ('-created_at', '-id')
+
+    def get_queryset(self):
+        return Recipe.objects.with_user_flags(
+            self.request.user).with_related()
+
+    def list(self, request, *args, **kwargs):
+        cache_key = get_list_cache_key(request)
+        if cache_key is None:
+            return Response(self.get_page_data(self.get_page()))
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.get_page_data(self.get_page())
+            cache.set(cache_key, data, LIST_CACHE_TIMEOUT)
+        else:
+            data = overlay_counters(data)
+        return Response(overlay_user_flags(data, request))
+
+    def get_page(self):
+        return self.paginate_queryset(
+            get_recipe_rows(self.filter_queryset(self.get_queryset())))
+
+    def get_page_data(self, page):
+        ids = [row['id'] for row in page]
+        return self.represent_page(
+            page, get_recipe_tags(ids), get_recipe_ingredients(ids))
+
+    def represent_page(self, page, tags, ingredients):
+        return self.get_paginated_response(represent_recipes(
+            page, tags, ingredients, self.request)).data
+
+    async def async_list(self, request, *args, **kwargs):
+        """Счётчики и флаги пользователя для страницы из кэша или строки
+        страницы и подписки пользователя загружаются параллельно."""
+        cache_key = await run_in_thread(request, get_list_cache_key, request)
+        data = None if cache_key is None else await run_in_thread(
+            request, cache.get, cache_key)
+        if data is None:
+            page, _ = await gather_queries(
+                request, (self.get_page,), (get_subscriptions, request))
+            ids = [row['id'] for row in page]
+            tags, ingredients = await gather_queries(
+                request, (get_recipe_tags, ids),
+                (get_recipe_ingredients, ids))
+            data = self.represent_page(page, tags, ingredients)
+            if cache_key is not None:
+                await run_in_thread(
+                    request, cache.set, cache_key, data, LIST_CACHE_TIMEOUT)
+            return Response(data)
+        ids = [recipe['id'] for recipe in data['results']]
+        counters, favorited, in_shopping_cart, subscriptions = (
+            await gather_queries(
+                request, (get_counters, ids),
+                (get_selected_ids, Favorite, request.user, ids),
+                (get_selected_ids, ShoppingCart, request.user, ids),
+                (get_subscriptions, request)))
+        return Response(apply_user_flags(
+            apply_counters(data, counters), favorited, in_shopping_cart,
+            subscriptions))
+
+    def get_recipe_row(self, pk):
+        row = get_object_or_404(get_recipe_rows(
+            self.filter_queryset(self.get_queryset())), pk=pk)
+        self.check_object_permissions(self.request, Recipe(
+            id=row['id'], author_id=row['author__id']))
+        return row
+
+    def retrieve(self, request, *args, **kwargs):
+        row = self.get_recipe_row(kwargs[self.lookup_field])
+        return Response(represent_recipes(
+            [row], get_recipe_tags([row['id']]),
+            get_recipe_ingredients([row['id']]), request)[0])
+
+    async def async_retrieve(self, request, *args, **kwargs):
+        """Рецепт, его теги, ингредиенты и подписки пользователя
+        загружаются параллельно."""
+        try:
+            pk = Recipe._meta.pk.to_python(kwargs[self.lookup_field])
+        except ValidationError:
+            raise Http404
+        row, tags, ingredients, _ = await gather_queries(
+            request, (self.get_recipe_row, pk), (get_recipe_tags, [pk]),
+            (get_recipe_ingredients, [pk]), (get_subscriptions, request))
+        return Response(represent_recipes(
+            [row], tags, ingredients, request)[0])
+
+    def get_response_data(self, recipe):
+        return RecipeResponseSerializer(
+            instance=self.get_queryset().get(pk=recipe.pk),
+            context={'request': self.request}).data
 
     def create(self, request, *args, **kwargs):
         serializer = RecipeRequestSerializer(
             data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
-        response_serializer = RecipeResponseSerializer(
-            instance=serializer.save(), context={'request': request})
         return Response(
-            response_serializer.data, status=status.HTTP_201_CREATED)
+            self.get_response_data(serializer.save()),
+            status=status.HTTP_201_CREATED)
 
     def update(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -71,12 +308,7 @@ class RecipeViewSet(ModelViewSet, SelectObjectMixin):
             instance, data=request.data,
             context={'request': request})
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
-        if getattr(instance, '_prefetched_objects_cache', None):
-            instance._prefetched_objects_cache = {}
-        response_serializer = RecipeResponseSerializer(
-            instance=serializer.save(), context={'request': request})
-        return Response(response_serializer.data)
+        return Response(self.get_response_data(serializer.save()))
 
     @action(detail=True, methods=('post', 'delete'),
             permission_classes=(permissions.IsAuthenticated,),
@@ -92,52 +324,86 @@ class RecipeViewSet(ModelViewSet, SelectObjectMixin):
         return self.add_delete_to_queryset(
             ShoppingCart.objects.all(), 'recipe', request)
 
+    @action(detail=False, methods=('post', 'delete'),
+            permission_classes=(permissions.IsAuthenticated,),
+            url_path='favorite', url_name='favorite-bulk')
+    def favorite_bulk(self, request):
+        return self.bulk_add_delete(
+            Favorite, 'recipe', Recipe.objects.all(), request)
+
+    @action(detail=False, methods=('post', 'delete'),
+            permission_classes=(permissions.IsAuthenticated,),
+            url_path='shopping_cart', url_name='shopping-cart-bulk')
+    def shopping_cart_bulk(self, request):
+        return self.bulk_add_delete(
+            ShoppingCart, 'recipe', Recipe.objects.all(), request)
+
     @action(detail=True,
             permission_classes=(permissions.AllowAny,),
             url_path='get-link')
     def get_link(self, request, pk):
-        url = f'http://{settings.BASE_SHORT_RECIPE_URL}/recipes/{pk}'
-        return Response(
-            {'short-link': pyshorteners.Shortener().tinyurl.short(url)})
+        cache_key = SHORT_LINK_RECIPE_KEY.format(pk)
+        code = cache.get(cache_key)
+        if code is None:
+            recipe = get_object_or_404(Recipe.objects.only('id'), pk=pk)
+            short_link, _ = ShortLink.objects.get_or_create(
+                recipe=recipe,
+                defaults={'code': ShortLink.make_code(recipe.pk)})
+            code = short_link.code
+            cache.set(cache_key, code)
+        return Response({'short-link': request.build_absolute_uri(
+            reverse('short-link', args=(code,)))})
 
     @action(detail=False,
             permission_classes=(permissions.IsAuthenticated,))
     def download_shopping_cart(self, request, pk=None):
-        name = 'recipe__ingredients__name'
-        measurement_unit = 'recipe__ingredients__measurement_unit'
-        amount = 'recipe__ingredients_amounts__amount'
-        ingredients = request.user.customer.select_related(
-            'recipe').order_by(name).values(
-                name, measurement_unit).annotate(amount=Sum(amount)).all()
-        if not ingredients:
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in FORMATS:
+            return Response(
+                {'file_format': f'Доступные форматы: {", ".join(FORMATS)}.'},
+                status=status.HTTP_400_BAD_REQUEST)
+        if not request.user.customer.exists():
             return Response(status=status.HTTP_400_BAD_REQUEST)
-        text = 'Список покупок:\n\n'
-        for number, ingredient in enumerate(ingredients, start=1):
-            amount = ingredient.get('amount')
-            text += (
-                f'{number}) '
-                f'{ingredient[name]} - '
-                f'{amount} '
-                f'{ingredient[measurement_unit]}\n')
-        response = HttpResponse(text, content_type='text/plain')
-        filename = 'shopping_cart.txt'
+        content_type, _ = FORMATS[file_format]
+        content = stream_shopping_list(request.user, file_format)
+        content_type = f'{content_type}; charset=utf-8'
+        if is_asgi_request(request):
+            response = HttpResponse(b''.join(content), content_type)
+        else:
+            response = StreamingHttpResponse(content, content_type)
+        filename = f'shopping_cart.{file_format}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
         return response
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogConditionalMixin, ReadOnlyModelViewSet):
     """Вьюсет для ингредиентов."""
 
+    catalog = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        limit = request.query_params.get('limit')
+        if limit is None:
+            return Response(ingredient_index.search(name))
+        if not limit.isdecimal() or int(limit) < 1:
+            raise serializers.ValidationError(
+                {'limit': 'Целое число не меньше 1.'})
+        return Response(ingredient_index.search(
+            name, min(int(limit), SEARCH_LIMIT)))
+
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(CatalogConditionalMixin, ReadOnlyModelViewSet):
     """Вьюсет для тэгов."""
 
+    catalog = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     filter_backends = (DjangoFilterBackend,)
@@ -148,6 +414,54 @@ class UserViewSet(UserViewSet, SelectObjectMixin):
     """Вьюсет для пользователей."""
 
     pagination_class = LimitPageNumberPagination
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+
+    @property
+    def keyset_ordering(self):
+        if self.action == 'subscriptions':
+            return ('subscription_id',)
+        return ('username',)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'subscriptions':
+            queryset = queryset.filter(
+                following__user=self.request.user).annotate(
+                    subscription_id=F('following__id')).order_by(
+                        'subscription_id')
+        if self.action in ('subscribe', 'subscriptions'):
+            queryset = queryset.prefetch_related(
+                self.get_recipes_prefetch())
+        return queryset
+
+    def get_subscription_recipes(self):
+        recipes = Recipe.objects.all()
+        recipes_limit = self.get_recipes_limit()
+        if recipes_limit:
+            recipes = recipes.filter(id__in=Subquery(
+                Recipe.objects.filter(author_id=OuterRef('author_id')).values(
+                    'id')[:recipes_limit]))
+        return recipes
+
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if not recipes_limit:
+            return None
+        if not recipes_limit.isdecimal() or not (
+                0 < int(recipes_limit) <= RECIPES_LIMIT_MAX):
+            raise serializers.ValidationError({'recipes_limit': (
+                f'Целое число от 1 до {RECIPES_LIMIT_MAX}.')})
+        return int(recipes_limit)
+
+    def get_recipes_prefetch(self):
+        return Prefetch(
+            'recipe_set', queryset=self.get_subscription_recipes(),
+            to_attr='subscription_recipes')
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset()).values(*USER_FIELDS))
+        return self.get_paginated_response(represent_users(page, request))
 
     @action(detail=False,
             permission_classes=(permissions.IsAuthenticated,),
@@ -179,11 +493,20 @@ class UserViewSet(UserViewSet, SelectObjectMixin):
         except IntegrityError:
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=('post', 'delete'),
+            permission_classes=(permissions.IsAuthenticated,),
+            url_path='subscribe', url_name='subscribe-bulk')
+    def subscribe_bulk(self, request):
+        return self.bulk_add_delete(
+            Follow, 'following', User.objects.all(), request)
+
     @action(detail=False, serializer_class=FollowSerializer,
             permission_classes=(permissions.IsAuthenticated,))
     def subscriptions(self, request, pk=None):
-        serializer = self.get_serializer(
-            self.paginate_queryset(
-                [follow.following for follow in request.user.follower.all()]),
-            many=True)
-        return self.get_paginated_response(serializer.data)
+        page = self.paginate_queryset(
+            self.get_queryset().prefetch_related(None).values(
+                *USER_FIELDS, 'subscription_id'))
+        recipes = get_author_recipes(
+            self.get_subscription_recipes(), [row['id'] for row in page])
+        return self.get_paginated_response(
+            represent_subscriptions(page, recipes, request))
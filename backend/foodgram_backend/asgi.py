@@ -2,6 +2,10 @@
 ASGI config for foodgram_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Read endpoints of recipes, tags and ingredients are served by async
+handlers unless ASYNC_READ_VIEWS is set to False, e.g.:
+
+    gunicorn -k uvicorn.workers.UvicornWorker foodgram_backend.asgi
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
@@ -11,6 +15,7 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kittygram_backend.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
 
 application = get_asgi_application()
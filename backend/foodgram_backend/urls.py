@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.urls import include, path
+from api.views import short_link_redirect
 
 api_urls = [
     path('', include('api.urls')),
@@ -10,4 +11,5 @@ api_urls = [
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include(api_urls)),
+    path('s/<str:code>/', short_link_redirect, name='short-link'),
 ]
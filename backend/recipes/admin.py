@@ -1,23 +1,16 @@
 from django.contrib import admin
-from django.db.models import Count
 
 from .models import (
-    Ingredient, IngredientAmount, Favorite, Recipe, Tag, ShoppingCart)
+    Ingredient, IngredientAmount, Favorite, Recipe, ShortLink, Tag,
+    ShoppingCart)
 
 
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'get_favorite_count')
+    list_display = (
+        'name', 'author', 'favorites_count', 'shopping_cart_count')
     list_filter = ('tags__name',)
     search_fields = ('name', 'author__username', 'author__id')
 
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        return queryset.annotate(favorite_count=Count('favorite'))
-
-    @staticmethod
-    def get_favorite_count(obj):
-        return obj.favorite_count
-
 
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit')
@@ -30,3 +23,4 @@ admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(IngredientAmount)
 admin.site.register(Favorite)
 admin.site.register(ShoppingCart)
+admin.site.register(ShortLink)
@@ -3,3 +3,8 @@ MEASUREMENT_MAX_LENGTH = 200
 RECIPE_TITLE_MAX_LENGTH = 200
 TAG_NAME_MAX_LENGTH = 200
 SLUG_MAX_LENGTH = 50
+SHORT_LINK_CODE_MAX_LENGTH = 16
+SHORT_LINK_ALPHABET = (
+    '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+IMAGE_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
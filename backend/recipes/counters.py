@@ -0,0 +1,56 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from users.models import Follow
+
+from .models import Favorite, Recipe, ShoppingCart
+
+User = get_user_model()
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Follow, 'following'),
+)
+
+
+def change_counters(sender, instance, delta):
+    """Меняет счётчики, которые ведутся по записям модели sender."""
+    for model, field, source, foreign_key in COUNTERS:
+        if source is not sender:
+            continue
+        counters = model.objects.filter(
+            pk=getattr(instance, f'{foreign_key}_id'))
+        if delta < 0:
+            counters = counters.filter(**{f'{field}__gte': -delta})
+        counters.update(**{field: F(field) + delta})
+
+
+def refresh_counters(sender, object_ids):
+    """Пересчитывает счётчики объектов после массовых записей sender,
+    для которых сигналы не отправляются."""
+    for model, field, source, foreign_key in COUNTERS:
+        if source is sender:
+            model.objects.filter(pk__in=object_ids).update(
+                **{field: get_actual_count(source, foreign_key)})
+
+
+def get_actual_count(source, foreign_key):
+    return Coalesce(Subquery(
+        source.objects.filter(**{foreign_key: OuterRef('pk')}).order_by()
+        .values(foreign_key).annotate(count=Count('pk')).values('count'),
+        output_field=IntegerField()), 0)
+
+
+def recount(model, field, source, foreign_key, dry_run=False):
+    """Исправляет расхождения счётчика с числом записей; возвращает
+    количество исправленных строк."""
+    actual = get_actual_count(source, foreign_key)
+    drifted = model.objects.annotate(actual=actual).exclude(
+        **{field: F('actual')}).values('pk')
+    count = drifted.count()
+    if count and not dry_run:
+        model.objects.filter(pk__in=Subquery(drifted)).update(
+            **{field: actual})
+    return count
@@ -0,0 +1,65 @@
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANTS = {
+    'thumbnail': (320, 320),
+    'medium': (960, 960),
+}
+VARIANT_FORMAT = 'webp'
+VARIANT_QUALITY = 80
+VARIANT_WORKERS = 2
+
+
+def get_variant_name(name, variant):
+    """Путь производного изображения рядом с исходным файлом."""
+    directory, filename = os.path.split(name)
+    stem, _ = os.path.splitext(filename)
+    return os.path.join(
+        directory, 'variants', f'{stem}_{variant}.{VARIANT_FORMAT}')
+
+
+def get_variant_names(name):
+    return {
+        variant: get_variant_name(name, variant)
+        for variant in IMAGE_VARIANTS}
+
+
+def make_variants(media_root, name):
+    """Создаёт недостающие варианты изображения."""
+    source_path = os.path.join(media_root, name)
+    with Image.open(source_path) as source:
+        source = ImageOps.exif_transpose(source)
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGBA')
+        for variant, size in IMAGE_VARIANTS.items():
+            path = os.path.join(media_root, get_variant_name(name, variant))
+            if os.path.exists(path):
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            image = source.copy()
+            image.thumbnail(size, Image.LANCZOS)
+            image.save(path, VARIANT_FORMAT, quality=VARIANT_QUALITY)
+    return name
+
+
+def has_variants(name):
+    return all(
+        default_storage.exists(variant_name)
+        for variant_name in get_variant_names(name).values())
+
+
+def create_variants(name):
+    """Создаёт варианты изображения до ответа клиенту: ссылки на них
+    отдаются в том же ответе и должны сразу открываться."""
+    if not name or has_variants(name):
+        return
+    try:
+        make_variants(str(settings.MEDIA_ROOT), name)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.exception('Не удалось создать варианты изображения %s', name)
@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from api.benchmark import REPEAT, run_benchmark
+from api.query_budgets import get_client, get_user
+
+
+class Command(BaseCommand):
+    help = 'benchmarking API endpoints: latency, queries and response size'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='имя пользователя для запросов')
+        parser.add_argument('--repeat', default=REPEAT, type=int,
+                            help='число замеров каждого адреса')
+        parser.add_argument('--cold', action='store_true',
+                            help='сбрасывать кэш страниц рецептов')
+        parser.add_argument('--output', help='файл для результатов в JSON')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть не меньше 1.')
+        user = get_user(options['user'])
+        if user is None:
+            raise CommandError('Нет пользователя для запросов.')
+        with get_client(user) as client:
+            results = run_benchmark(
+                client, user, options['repeat'], options['cold'])
+        report = json.dumps(
+            {'repeat': options['repeat'], 'cold': options['cold'],
+             'endpoints': results},
+            ensure_ascii=False, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report + '\n')
+        else:
+            self.stdout.write(report)
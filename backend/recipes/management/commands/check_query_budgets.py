@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.query_budgets import (
+    PAGE_SIZES, check_budgets, get_client, get_user, get_violations)
+
+
+class Command(BaseCommand):
+    help = 'checking SQL query budgets of API endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='имя пользователя для запросов')
+        parser.add_argument('--page-sizes', default=PAGE_SIZES, type=int,
+                            nargs='+', help='размеры страниц')
+
+    def handle(self, *args, **options):
+        user = get_user(options['user'])
+        if user is None:
+            raise CommandError('Нет пользователя для запросов.')
+        with get_client(user) as client:
+            results = check_budgets(client, options['page_sizes'])
+        for url_name, url, queries, budget in results:
+            self.stdout.write(f'{queries:>4} / {budget or "-":>4}  {url}')
+        violations = get_violations(results)
+        if violations:
+            raise CommandError(
+                'Превышен бюджет запросов: ' + ', '.join(
+                    f'{url} ({queries} > {budget})'
+                    for _, url, queries, budget in violations))
+        self.stdout.write(self.style.SUCCESS('Бюджеты запросов соблюдены'))
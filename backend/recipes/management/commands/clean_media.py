@@ -0,0 +1,68 @@
+import os
+from time import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from recipes.images import get_variant_names
+from recipes.models import Recipe
+
+User = get_user_model()
+MIN_AGE = 60 * 60
+
+
+def scan_files(path):
+    """Файлы каталога и его подкаталогов без построения полного списка."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from scan_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+class Command(BaseCommand):
+    help = 'removing media files not referenced by recipes or users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='только показать файлы для удаления')
+        parser.add_argument('--min-age', default=MIN_AGE, type=int,
+                            help='не трогать файлы моложе, секунд')
+
+    def get_referenced(self):
+        referenced = set()
+        for model, field in ((Recipe, 'image'), (User, 'avatar')):
+            names = model.objects.exclude(**{field: ''}).exclude(
+                **{f'{field}__isnull': True}).values_list(field, flat=True)
+            for name in names.iterator():
+                referenced.add(name)
+                referenced.update(get_variant_names(name).values())
+        return referenced
+
+    def handle(self, *args, **options):
+        media_root = str(settings.MEDIA_ROOT)
+        referenced = self.get_referenced()
+        upload_dirs = {
+            Recipe._meta.get_field('image').upload_to,
+            User._meta.get_field('avatar').upload_to}
+        newest = time() - options['min_age']
+        removed = freed = 0
+        for upload_dir in upload_dirs:
+            path = os.path.join(media_root, upload_dir)
+            if not os.path.isdir(path):
+                continue
+            for entry in scan_files(path):
+                name = os.path.relpath(entry.path, media_root)
+                stat = entry.stat(follow_symlinks=False)
+                if name in referenced or stat.st_mtime > newest:
+                    continue
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    os.remove(entry.path)
+                removed += 1
+                freed += stat.st_size
+        self.stdout.write(self.style.SUCCESS(
+            f'Неиспользуемых файлов: {removed}, '
+            f'{freed / 1024 / 1024:.1f} МБ'))
@@ -0,0 +1,205 @@
+import io
+import random
+from itertools import accumulate
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from PIL import Image
+from api.catalog import bump_catalog_version
+from api.pantry_index import pantry_index
+from api.recipe_search import recipe_search_index
+from recipes.counters import COUNTERS, recount
+from recipes.images import create_variants
+from recipes.models import (
+    Favorite, Ingredient, IngredientAmount, Recipe, ShoppingCart, Tag)
+from users.models import Follow
+
+User = get_user_model()
+BATCH_SIZE = 1000
+PASSWORD = 'synthetic-password'
+DISHES = (
+    'Суп', 'Салат', 'Пирог', 'Рагу', 'Паста', 'Каша', 'Запеканка',
+    'Омлет', 'Плов', 'Ризотто', 'Котлеты', 'Блины', 'Торт', 'Жаркое')
+ADJECTIVES = (
+    'домашний', 'быстрый', 'летний', 'пряный', 'сытный', 'лёгкий',
+    'праздничный', 'деревенский', 'острый', 'нежный')
+STEPS = (
+    'Нарезать {}.', 'Обжарить {} до золотистого цвета.',
+    'Добавить {} и перемешать.', 'Тушить {} под крышкой.',
+    'Запечь {} в духовке.', 'Подавать {} горячим.')
+
+
+def get_cum_weights(count, skew):
+    """Накопленные веса закона Ципфа: первые элементы популярнее."""
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+
+class Command(BaseCommand):
+    help = 'generating synthetic users, recipes and relations for load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', default=1000, type=int)
+        parser.add_argument('--recipes', default=10000, type=int)
+        parser.add_argument('--tags', default=12, type=int)
+        parser.add_argument('--ingredients-per-recipe', default=8, type=int)
+        parser.add_argument('--favorites-per-user', default=20, type=int)
+        parser.add_argument('--cart-per-user', default=5, type=int)
+        parser.add_argument('--follows-per-user', default=10, type=int)
+        parser.add_argument('--skew', default=1.1, type=float,
+                            help='показатель закона Ципфа для популярности')
+        parser.add_argument('--seed', default=0, type=int)
+        parser.add_argument('--batch-size', default=BATCH_SIZE, type=int)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.skew = options['skew']
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                'Нет ингредиентов, сначала выполните import_json.')
+        self.random.shuffle(ingredient_ids)
+        start = perf_counter()
+        tag_ids = self.create_tags(options['tags'])
+        user_ids = self.create_users(options['users'])
+        if not user_ids:
+            raise CommandError('Нужен хотя бы один пользователь.')
+        recipe_ids = self.create_recipes(
+            options['recipes'], user_ids, tag_ids, ingredient_ids,
+            options['ingredients_per_recipe'])
+        authors = list(dict.fromkeys(
+            Recipe.objects.filter(pk__in=recipe_ids).values_list(
+                'author_id', flat=True)))
+        relations = {
+            Favorite: ('recipe_id', recipe_ids, 'favorites_per_user'),
+            ShoppingCart: ('recipe_id', recipe_ids, 'cart_per_user'),
+            Follow: ('following_id', authors, 'follows_per_user'),
+        }
+        rows = {}
+        for model, (field, targets, option) in relations.items():
+            rows[model] = self.create_relations(
+                model, field, user_ids, targets, options[option])
+        self.reset_sequences()
+        for counter in COUNTERS:
+            recount(*counter)
+        bump_catalog_version('tags')
+        recipe_search_index.invalidate()
+        pantry_index.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {len(user_ids)}, рецептов: {len(recipe_ids)}, '
+            f'избранного: {rows[Favorite]}, в корзинах: '
+            f'{rows[ShoppingCart]}, подписок: {rows[Follow]} '
+            f'за {perf_counter() - start:.1f} с'))
+
+    def choose(self, population, cum_weights, count):
+        if not population or count <= 0:
+            return set()
+        return set(self.random.choices(
+            population, cum_weights=cum_weights, k=count))
+
+    def get_next_id(self, model):
+        return (model.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+
+    def create_tags(self, count):
+        Tag.objects.bulk_create(
+            [Tag(name=f'Тег {number}', slug=f'tag-{number}')
+             for number in range(1, count + 1)],
+            ignore_conflicts=True)
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_users(self, count):
+        first_id = self.get_next_id(User)
+        password = make_password(PASSWORD)
+        users = [
+            User(id=user_id, username=f'user{user_id}',
+                 email=f'user{user_id}@example.com',
+                 first_name='Имя', last_name='Фамилия', password=password)
+            for user_id in range(first_id, first_id + count)]
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        return [user.id for user in users]
+
+    def get_image(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (640, 480), (200, 120, 60)).save(buffer, 'JPEG')
+        name = default_storage.save(
+            'recipes/synthetic.jpg', ContentFile(buffer.getvalue()))
+        create_variants(name)
+        return name
+
+    def create_recipes(self, count, user_ids, tag_ids, ingredient_ids,
+                       ingredients_per_recipe):
+        image = self.get_image()
+        author_weights = get_cum_weights(len(user_ids), self.skew)
+        tag_weights = get_cum_weights(len(tag_ids), self.skew)
+        ingredient_weights = get_cum_weights(len(ingredient_ids), self.skew)
+        first_id = self.get_next_id(Recipe)
+        recipe_ids = list(range(first_id, first_id + count))
+        for batch_start in range(0, count, self.batch_size):
+            recipes, recipe_tags, amounts = [], [], []
+            for recipe_id in recipe_ids[
+                    batch_start:batch_start + self.batch_size]:
+                ingredients = self.choose(
+                    ingredient_ids, ingredient_weights,
+                    self.random.randint(
+                        max(ingredients_per_recipe // 2, 1),
+                        ingredients_per_recipe * 3 // 2))
+                recipes.append(Recipe(
+                    id=recipe_id,
+                    author_id=self.random.choices(
+                        user_ids, cum_weights=author_weights)[0],
+                    name=(f'{self.random.choice(DISHES)} '
+                          f'{self.random.choice(ADJECTIVES)} №{recipe_id}'),
+                    text=' '.join(
+                        self.random.choice(STEPS).format(f'ингредиент {pk}')
+                        for pk in ingredients),
+                    image=image,
+                    cooking_time=self.random.randint(5, 180)))
+                recipe_tags.extend(
+                    Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+                    for tag_id in self.choose(
+                        tag_ids, tag_weights, self.random.randint(1, 3)))
+                amounts.extend(
+                    IngredientAmount(
+                        recipe_id=recipe_id, ingredient_id=ingredient_id,
+                        amount=self.random.randint(1, 500))
+                    for ingredient_id in ingredients)
+            with transaction.atomic():
+                Recipe.objects.bulk_create(recipes)
+                Recipe.tags.through.objects.bulk_create(recipe_tags)
+                IngredientAmount.objects.bulk_create(amounts)
+        return recipe_ids
+
+    def create_relations(self, model, field, user_ids, targets, per_user):
+        """Связи пользователей с популярными объектами: число связей у
+        пользователя случайно, выбор объектов — по закону Ципфа."""
+        weights = get_cum_weights(len(targets), self.skew)
+        existing = model.objects.count()
+        for batch_start in range(0, len(user_ids), self.batch_size):
+            rows = []
+            for user_id in user_ids[
+                    batch_start:batch_start + self.batch_size]:
+                chosen = self.choose(
+                    targets, weights, self.random.randint(0, per_user * 2))
+                if model is Follow:
+                    chosen.discard(user_id)
+                rows.extend(
+                    model(user_id=user_id, **{field: target})
+                    for target in chosen)
+            model.objects.bulk_create(
+                rows, batch_size=self.batch_size, ignore_conflicts=True)
+        return model.objects.count() - existing
+
+    def reset_sequences(self):
+        """Выставляет счётчики id после вставки строк с явными id."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Recipe])
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
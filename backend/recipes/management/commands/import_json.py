@@ -1,28 +1,124 @@
+import csv
 import json
 import os
+from itertools import islice
+from time import perf_counter
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.ingredient_index import ingredient_index
 from recipes.models import Ingredient
 
 DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
+BATCH_SIZE = 1000
+READ_SIZE = 64 * 1024
+SEPARATORS = frozenset(', \t\r\n')
+
+
+def read_json(file):
+    """Объекты верхнеуровневого JSON-массива, разбираемые по одному."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив ингредиентов')
+    position = 1
+    while True:
+        while position < len(buffer) and buffer[position] in SEPARATORS:
+            position += 1
+        if buffer.startswith(']', position):
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as err:
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                raise CommandError('Некорректный JSON') from err
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield item['name'], item['measurement_unit']
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            name, measurement_unit = row
+            yield name, measurement_unit
+
+
+READERS = {'.json': read_json, '.csv': read_csv}
 
 
 class Command(BaseCommand):
-    help = 'loading ingredients from data in json'
+    help = 'loading ingredients from data in json or csv'
 
     def add_arguments(self, parser):
         parser.add_argument('filename', default='ingredients.json', nargs='?',
                             type=str)
+        parser.add_argument('--batch-size', default=BATCH_SIZE, type=int)
+        parser.add_argument('--dry-run', action='store_true',
+                            help='показать отличия от базы без записи')
 
     def handle(self, *args, **options):
+        filename = options.get('filename')
+        reader = READERS.get(os.path.splitext(filename)[1])
+        if reader is None:
+            raise CommandError('Поддерживаются файлы .json и .csv')
+        started = perf_counter()
         try:
-            with open(os.path.join(DATA_ROOT, options.get('filename')), 'r',
-                      encoding='utf-8') as file_data_json:
-                data_ingredient = json.load(file_data_json)
-                for ingredient_item in data_ingredient:
-                    Ingredient.objects.get_or_create(
-                        name=ingredient_item['name'],
-                        measurement_unit=ingredient_item['measurement_unit'])
+            with open(os.path.join(DATA_ROOT, filename), 'r',
+                      encoding='utf-8') as file_data:
+                rows = reader(file_data)
+                if options['dry_run']:
+                    total = self.diff(rows)
+                else:
+                    total = self.load(rows, options['batch_size'])
         except FileNotFoundError as err:
             raise CommandError('Файл отсутствует в директории data') from err
+        elapsed = perf_counter() - started
+        self.stdout.write(
+            f'Обработано строк: {total} за {elapsed:.2f} с '
+            f'({total / elapsed:.0f} строк/с)')
+
+    def load(self, rows, batch_size):
+        total = 0
+        with transaction.atomic():
+            count_before = Ingredient.objects.count()
+            while True:
+                batch = [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in islice(rows, batch_size)]
+                if not batch:
+                    break
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                total += len(batch)
+            created = Ingredient.objects.count() - count_before
+        ingredient_index.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f'Добавлено ингредиентов: {created}'))
+        return total
+
+    def diff(self, rows):
+        existing = set(
+            Ingredient.objects.values_list('name', 'measurement_unit'))
+        total = 0
+        added = []
+        seen = set()
+        for row in rows:
+            total += 1
+            if row in seen:
+                continue
+            seen.add(row)
+            if row in existing:
+                existing.discard(row)
+            else:
+                added.append(row)
+        for name, measurement_unit in added:
+            self.stdout.write(f'+ {name}, {measurement_unit}')
+        for name, measurement_unit in sorted(existing):
+            self.stdout.write(f'- {name}, {measurement_unit}')
+        self.stdout.write(
+            f'Будет добавлено: {len(added)}, '
+            f'нет в файле: {len(existing)}')
+        return total
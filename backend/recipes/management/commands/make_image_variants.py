@@ -0,0 +1,39 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from recipes.images import VARIANT_WORKERS, has_variants, make_variants
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'creating thumbnails and webp variants for stored images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default=VARIANT_WORKERS, type=int)
+
+    def handle(self, *args, **options):
+        names = chain(
+            Recipe.objects.exclude(image='').exclude(
+                image__isnull=True).values_list('image', flat=True),
+            User.objects.exclude(avatar='').exclude(
+                avatar__isnull=True).values_list('avatar', flat=True))
+        missing = {name for name in names if not has_variants(name)}
+        media_root = str(settings.MEDIA_ROOT)
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(make_variants, media_root, name): name
+                for name in missing}
+            for future, name in futures.items():
+                if future.exception() is None:
+                    done += 1
+                else:
+                    failed += 1
+                    self.stderr.write(f'{name}: {future.exception()}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано вариантов для изображений: {done}, ошибок: {failed}'))
@@ -0,0 +1,24 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from api.catalog import is_cache_shared
+from api.recipe_search import recipe_search_index
+
+
+class Command(BaseCommand):
+    help = 'rebuilding the recipe search index'
+
+    def handle(self, *args, **options):
+        if not is_cache_shared():
+            raise CommandError(
+                'Кэш локален для процесса: серверы не узнают о перестроении '
+                'индекса. Настройте общий кэш в CACHES.')
+        started = perf_counter()
+        recipe_search_index.build()
+        elapsed = perf_counter() - started
+        recipe_search_index.invalidate()
+        documents, terms = recipe_search_index.stats
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецептов в индексе: {documents}, слов: {terms}, '
+            f'за {elapsed:.2f} с. Серверы перестроят индекс при следующем '
+            f'поиске.'))
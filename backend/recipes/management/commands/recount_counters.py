@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.counters import COUNTERS, recount
+
+
+class Command(BaseCommand):
+    help = 'recounting denormalized counters of recipes and users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='только показать расхождения')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        for model, field, source, foreign_key in COUNTERS:
+            fixed = recount(
+                model, field, source, foreign_key, options['dry_run'])
+            self.stdout.write(
+                f'{model._meta.model_name}.{field}: расхождений {fixed}')
+        self.stdout.write(self.style.SUCCESS('Счётчики проверены'))
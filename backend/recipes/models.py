@@ -1,10 +1,12 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
 
 from .constants import (
     INGREDIENT_NAME_MAX_LENGTH, MEASUREMENT_MAX_LENGTH,
-    RECIPE_TITLE_MAX_LENGTH, SLUG_MAX_LENGTH, TAG_NAME_MAX_LENGTH)
+    RECIPE_TITLE_MAX_LENGTH, SHORT_LINK_ALPHABET, SHORT_LINK_CODE_MAX_LENGTH,
+    SLUG_MAX_LENGTH, TAG_NAME_MAX_LENGTH)
 
 User = get_user_model()
 
@@ -53,6 +55,29 @@ class Tag(models.Model):
             f'{self.slug=}')
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Queryset рецептов с флагами пользователя и связанными объектами."""
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()))
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user_id=user.id, recipe_id=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user_id=user.id, recipe_id=OuterRef('pk'))))
+
+    def with_related(self):
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'ingredients_amounts',
+                queryset=IngredientAmount.objects.select_related(
+                    'ingredient')))
+
+
 class Recipe(models.Model):
     """Модель для рецептов."""
 
@@ -74,6 +99,12 @@ class Recipe(models.Model):
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Добавлено')
+    favorites_count = models.PositiveIntegerField(
+        'В избранном', default=0, editable=False)
+    shopping_cart_count = models.PositiveIntegerField(
+        'В корзинах', default=0, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
@@ -156,3 +187,34 @@ class ShoppingCart(SelectRecipeBaseModel):
         constraints = [
             models.UniqueConstraint(
                 fields=('user', 'recipe'), name='unique_shopping_cart')]
+
+
+class ShortLink(models.Model):
+    """Модель для коротких ссылок на рецепты."""
+
+    recipe = models.OneToOneField(
+        Recipe, on_delete=models.CASCADE, related_name='short_link',
+        verbose_name='Рецепт')
+    code = models.CharField(
+        max_length=SHORT_LINK_CODE_MAX_LENGTH, unique=True,
+        verbose_name='Код ссылки')
+
+    class Meta:
+        verbose_name = 'Короткая ссылка'
+        verbose_name_plural = 'Короткие ссылки'
+
+    def __str__(self):
+        return (
+            f'{self.code=}, '
+            f'{self.recipe_id=}')
+
+    @staticmethod
+    def make_code(recipe_id):
+        """Код в base62, однозначно вычисляемый из id рецепта."""
+        base = len(SHORT_LINK_ALPHABET)
+        code = ''
+        while True:
+            recipe_id, remainder = divmod(recipe_id, base)
+            code = SHORT_LINK_ALPHABET[remainder] + code
+            if not recipe_id:
+                return code
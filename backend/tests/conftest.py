@@ -0,0 +1,67 @@
+from base64 import b64encode
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from PIL import Image
+from rest_framework.test import APIClient
+from api.query_budgets import get_user
+from recipes.models import Ingredient, Tag
+
+
+@pytest.fixture(autouse=True)
+def local_cache(settings, tmp_path):
+    """Кэш и медиафайлы тестов не пересекаются с рабочими."""
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    settings.MEDIA_ROOT = str(tmp_path)
+    cache.clear()
+
+
+@pytest.fixture
+def budget_data(db):
+    """Небольшой набор данных со всеми связями, которые читает API."""
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'{name} {number}', measurement_unit='г')
+        for name in ('абрикос', 'базилик', 'ваниль')
+        for number in range(10))
+    call_command(
+        'generate_data', users=12, recipes=60, tags=4,
+        ingredients_per_recipe=5, favorites_per_user=6, cart_per_user=3,
+        follows_per_user=4, stdout=StringIO())
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(budget_data):
+    client = APIClient()
+    client.force_authenticate(get_user())
+    return client
+
+
+@pytest.fixture
+def image():
+    """Картинка в base64, как её присылает фронтенд."""
+    buffer = BytesIO()
+    Image.new('RGB', (40, 30), 'red').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + b64encode(buffer.getvalue()).decode()
+
+
+@pytest.fixture
+def recipe_payload(budget_data, image):
+    """Данные нового рецепта с одним тегом и ингредиентами."""
+    def make(name, text, ingredient_ids=None):
+        if ingredient_ids is None:
+            ingredient_ids = Ingredient.objects.values_list(
+                'id', flat=True)[:1]
+        return {
+            'name': name, 'text': text, 'cooking_time': 5, 'image': image,
+            'tags': [Tag.objects.values_list('id', flat=True).first()],
+            'ingredients': [
+                {'id': pk, 'amount': 3} for pk in ingredient_ids]}
+    return make
@@ -0,0 +1,73 @@
+import pytest
+from api.authentication import cache_user, get_cached_user, use_auth_cache
+from api.query_budgets import get_user
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def token_client(budget_data, monkeypatch):
+    """Клиент с токеном; кэш тестов считается общим, как Memcached."""
+    monkeypatch.setattr('api.authentication.use_auth_cache', lambda: True)
+    client = APIClient()
+    token = Token.objects.create(user=get_user())
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    assert client.get('/api/users/me/').status_code == 200
+    return client
+
+
+def test_cached_token_skips_token_query(
+        token_client, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        assert token_client.get('/api/users/me/').status_code == 200
+
+
+def test_logout_invalidates_token(
+        token_client, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        response = token_client.post('/api/auth/token/logout/')
+    assert response.status_code == 204
+    assert token_client.get('/api/users/me/').status_code == 401
+
+
+def test_deactivation_invalidates_user(
+        token_client, django_capture_on_commit_callbacks):
+    user = get_user()
+    user.is_active = False
+    with django_capture_on_commit_callbacks(execute=True):
+        user.save()
+    assert token_client.get('/api/users/me/').status_code == 401
+
+
+def test_follow_updates_cached_counters(
+        token_client, django_capture_on_commit_callbacks):
+    user = get_user()
+    follower = APIClient()
+    follower.force_authenticate(user.following.first().user)
+    before = token_client.get('/api/users/me/').json()['followers_count']
+    with django_capture_on_commit_callbacks(execute=True):
+        follower.delete(f'/api/users/{user.pk}/subscribe/')
+    assert token_client.get('/api/users/me/').json()[
+        'followers_count'] == before - 1
+
+
+def test_stale_user_is_not_cached_after_invalidation(
+        token_client, django_capture_on_commit_callbacks):
+    """Запрос прочитал пользователя до деактивации, а записал в кэш
+    после неё."""
+    user = get_user()
+    key = user.auth_token.key
+    stale, generation = get_cached_user(key)
+    user.is_active = False
+    with django_capture_on_commit_callbacks(execute=True):
+        user.save()
+    cache_user(key, stale, generation)
+    assert get_cached_user(key)[0] is None
+    assert token_client.get('/api/users/me/').status_code == 401
+
+
+def test_database_cache_falls_back_to_token_table(settings):
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache'}}
+    assert not use_auth_cache()
@@ -0,0 +1,77 @@
+from api.query_budgets import get_user
+from api.views import SelectObjectMixin
+from recipes.models import Favorite, Recipe
+from users.models import Follow, User
+
+
+def get_results(response):
+    assert response.status_code == 200
+    return {item['id']: item['result'] for item in response.json()['results']}
+
+
+def test_bulk_favorite_reports_each_id(budget_data, user_client):
+    user = get_user()
+    added = Recipe.objects.filter(favorite__user=user).first().pk
+    new = Recipe.objects.exclude(favorite__user=user).first().pk
+    missing = Recipe.objects.order_by('-pk').first().pk + 1
+    results = get_results(user_client.post(
+        '/api/recipes/favorite/', {'ids': [added, new, missing, new]},
+        format='json'))
+    assert results == {added: 'exists', new: 'created', missing: 'not_found'}
+    assert Recipe.objects.get(pk=new).favorites_count == (
+        Favorite.objects.filter(recipe_id=new).count())
+    results = get_results(user_client.delete(
+        '/api/recipes/favorite/', {'ids': [added, new, missing]},
+        format='json'))
+    assert results == {added: 'deleted', new: 'deleted', missing: 'not_found'}
+    assert not Favorite.objects.filter(
+        user=user, recipe_id__in=(added, new)).exists()
+    results = get_results(user_client.delete(
+        '/api/recipes/favorite/', {'ids': [new]}, format='json'))
+    assert results == {new: 'absent'}
+
+
+def test_bulk_subscribe_rejects_self(budget_data, user_client):
+    user = get_user()
+    following = User.objects.exclude(pk=user.pk).exclude(
+        following__user=user).first()
+    results = get_results(user_client.post(
+        '/api/users/subscribe/', {'ids': [user.pk, following.pk]},
+        format='json'))
+    assert results == {user.pk: 'invalid', following.pk: 'created'}
+    assert not Follow.objects.filter(user=user, following=user).exists()
+    assert User.objects.get(pk=following.pk).followers_count == (
+        Follow.objects.filter(following=following).count())
+
+
+def test_bulk_rejects_invalid_ids(budget_data, user_client, api_client):
+    assert user_client.post(
+        '/api/recipes/favorite/', {'ids': []},
+        format='json').status_code == 400
+    assert api_client.post(
+        '/api/recipes/favorite/', {'ids': [1]},
+        format='json').status_code == 401
+
+
+def test_concurrent_insert_is_reported_as_existing(
+        budget_data, user_client, monkeypatch):
+    user = get_user()
+    ids = list(Recipe.objects.exclude(
+        favorite__user=user).values_list('id', flat=True)[:3])
+    insert_selected = SelectObjectMixin.insert_selected
+
+    def race(*args):
+        """Параллельный запрос вставляет запись после проверки."""
+        Favorite.objects.create(user=user, recipe_id=ids[0])
+        return insert_selected(*args)
+
+    monkeypatch.setattr(
+        SelectObjectMixin, 'insert_selected', staticmethod(race))
+    response = user_client.post(
+        '/api/recipes/favorite/', {'ids': ids}, format='json')
+    assert response.status_code == 200
+    assert response.json()['results'] == [
+        {'id': ids[0], 'result': 'exists'},
+        {'id': ids[1], 'result': 'created'},
+        {'id': ids[2], 'result': 'created'}]
+    assert Favorite.objects.filter(user=user, recipe_id__in=ids).count() == 3
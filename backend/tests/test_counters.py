@@ -0,0 +1,55 @@
+from io import StringIO
+
+from api.query_budgets import get_user
+from django.core.management import call_command
+from recipes.models import Favorite, Recipe
+from users.models import Follow, User
+
+
+def get_listed(client, recipe_id):
+    """Рецепт со страницы списка, которая кэшируется целиком."""
+    response = client.get('/api/recipes/', {'limit': 100})
+    return next(
+        recipe for recipe in response.json()['results']
+        if recipe['id'] == recipe_id)
+
+
+def test_recipe_counters_follow_favorites_and_cart(budget_data, user_client):
+    recipe = Recipe.objects.exclude(
+        favorite__user=get_user()).exclude(customer__user=get_user()).first()
+    before = get_listed(user_client, recipe.pk)
+    user_client.post(f'/api/recipes/{recipe.pk}/favorite/')
+    user_client.post(f'/api/recipes/{recipe.pk}/shopping_cart/')
+    listed = get_listed(user_client, recipe.pk)
+    assert listed['favorites_count'] == before['favorites_count'] + 1
+    assert listed['shopping_cart_count'] == (
+        before['shopping_cart_count'] + 1)
+    assert user_client.get(f'/api/recipes/{recipe.pk}/').json()[
+        'favorites_count'] == Favorite.objects.filter(recipe=recipe).count()
+    user_client.delete(f'/api/recipes/{recipe.pk}/favorite/')
+    assert get_listed(user_client, recipe.pk)['favorites_count'] == (
+        before['favorites_count'])
+
+
+def test_followers_count_follows_subscriptions(budget_data, user_client):
+    following = User.objects.exclude(pk=get_user().pk).exclude(
+        following__user=get_user()).first()
+    response = user_client.post(f'/api/users/{following.pk}/subscribe/')
+    assert response.status_code == 201
+    assert response.json()['followers_count'] == Follow.objects.filter(
+        following=following).count()
+    user_client.delete(f'/api/users/{following.pk}/subscribe/')
+    assert user_client.get(f'/api/users/{following.pk}/').json()[
+        'followers_count'] == Follow.objects.filter(
+            following=following).count()
+
+
+def test_counters_match_rows(budget_data, user_client):
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True)[:5])
+    user_client.post(
+        '/api/recipes/favorite/', {'ids': recipe_ids}, format='json')
+    user_client.delete(
+        '/api/recipes/shopping_cart/', {'ids': recipe_ids}, format='json')
+    stdout = StringIO()
+    call_command('recount_counters', '--dry-run', stdout=stdout)
+    assert stdout.getvalue().count('расхождений 0') == 4
@@ -0,0 +1,56 @@
+import json
+from base64 import urlsafe_b64encode
+
+import pytest
+from api.query_budgets import get_user
+from recipes.models import Recipe
+from users.models import User
+
+
+def encode(position):
+    return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def walk(client, url):
+    """id всех объектов, пройденных по ссылкам next."""
+    ids = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        ids += [item['id'] for item in response.json()['results']]
+        url = response.json()['next']
+    return ids
+
+
+def test_recipes_cursor_walks_all_in_order(budget_data, api_client):
+    expected = list(Recipe.objects.order_by(
+        '-created_at', '-id').values_list('id', flat=True))
+    assert walk(api_client, '/api/recipes/?limit=7&cursor=') == expected
+
+
+def test_users_cursor_walks_all_in_order(budget_data, api_client):
+    expected = list(User.objects.order_by(
+        'username').values_list('id', flat=True))
+    assert walk(api_client, '/api/users/?limit=5&cursor=') == expected
+
+
+def test_subscriptions_cursor_walks_all(budget_data, user_client):
+    ids = walk(user_client, '/api/users/subscriptions/?limit=2&cursor=')
+    assert ids == list(get_user().follower.order_by('id').values_list(
+        'following_id', flat=True))
+
+
+@pytest.mark.parametrize('cursor', [
+    'not-base64!', encode({'a': 1}), encode([1]), encode([{}, 1]),
+    encode(['x', 'y']), encode([None, 1]), encode([[1], 1]),
+    encode(['2024-01-01T00:00:00+00:00', True]),
+])
+def test_recipes_invalid_cursor(budget_data, api_client, cursor):
+    response = api_client.get('/api/recipes/', {'cursor': cursor})
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize('position', [[[1]], [{}], [None], ['a', 'b']])
+def test_users_invalid_cursor(budget_data, api_client, position):
+    response = api_client.get('/api/users/', {'cursor': encode(position)})
+    assert response.status_code == 404
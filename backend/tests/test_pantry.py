@@ -0,0 +1,116 @@
+from collections import Counter, defaultdict
+from threading import Barrier, Thread
+from time import sleep
+
+import pytest
+from api.catalog import bump_catalog_version, get_catalog_version
+from api.pantry_index import PANTRY_CATALOG, PantryIndex
+from recipes.models import Ingredient, IngredientAmount
+
+
+class CountingIndex(PantryIndex):
+    """Индекс без базы, считающий чтения документов; чтение
+    растянуто, чтобы параллельные запросы застали его."""
+
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+
+    def get_documents(self, recipe_ids=None):
+        self.reads += 1
+        sleep(0.05)
+        return {}
+
+
+def test_concurrent_requests_build_index_once():
+    index = CountingIndex()
+    barrier = Barrier(8)
+
+    def search():
+        barrier.wait()
+        index.ensure_current()
+
+    threads = [Thread(target=search) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert index.reads == 1
+
+
+def test_update_keeps_index_in_sync():
+    index = CountingIndex()
+    index.ensure_current()
+    index.update({1})
+    index.ensure_current()
+    assert index.reads == 2
+
+
+def test_update_after_foreign_write_rebuilds():
+    index = CountingIndex()
+    index.ensure_current()
+    bump_catalog_version(PANTRY_CATALOG)
+    index.update({1})
+    assert index._version != get_catalog_version(PANTRY_CATALOG)
+    index.ensure_current()
+    assert index.reads == 2
+
+
+def get_recipe_ingredients():
+    recipes = defaultdict(set)
+    for recipe_id, ingredient_id in IngredientAmount.objects.values_list(
+            'recipe_id', 'ingredient_id'):
+        recipes[recipe_id].add(ingredient_id)
+    return recipes
+
+
+def get_ids(client, params):
+    response = client.get('/api/recipes/', {**params, 'limit': 100})
+    assert response.status_code == 200
+    return sorted(recipe['id'] for recipe in response.json()['results'])
+
+
+def join(ids):
+    return ','.join(map(str, ids))
+
+
+@pytest.mark.parametrize('name, matches', (
+    ('ingredients', lambda found, chosen: chosen <= found),
+    ('ingredients_any', lambda found, chosen: bool(chosen & found)),
+    ('exclude_ingredients', lambda found, chosen: not chosen & found),
+))
+def test_ingredient_filters(budget_data, api_client, name, matches):
+    recipes = get_recipe_ingredients()
+    chosen = {pk for pk, _ in Counter(
+        pk for found in recipes.values() for pk in found).most_common(2)}
+    assert get_ids(api_client, {name: join(chosen)}) == sorted(
+        pk for pk, found in recipes.items() if matches(found, chosen))
+
+
+@pytest.mark.parametrize('missing', (0, 1, 2))
+def test_pantry_allows_missing_ingredients(budget_data, api_client, missing):
+    recipes = get_recipe_ingredients()
+    first, second = list(recipes.values())[:2]
+    pantry = first | second
+    expected = sorted(
+        pk for pk, found in recipes.items()
+        if len(found - pantry) <= missing)
+    assert expected
+    assert get_ids(
+        api_client, {'pantry': join(pantry), 'missing': missing}) == expected
+
+
+def test_filter_follows_recipe_changes(
+        user_client, recipe_payload, django_capture_on_commit_callbacks):
+    ingredient_id, other_id = Ingredient.objects.values_list(
+        'id', flat=True)[:2]
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe_id = user_client.post('/api/recipes/', recipe_payload(
+            'Суп', 'Сварить', [ingredient_id]), format='json').json()['id']
+    assert recipe_id in get_ids(user_client, {'ingredients': ingredient_id})
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.patch(f'/api/recipes/{recipe_id}/', recipe_payload(
+            'Суп', 'Сварить', [other_id]), format='json')
+    assert recipe_id not in get_ids(
+        user_client, {'ingredients': ingredient_id})
+    assert recipe_id in get_ids(user_client, {'ingredients': other_id})
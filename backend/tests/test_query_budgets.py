@@ -0,0 +1,18 @@
+import pytest
+from api.query_budgets import (
+    PAGE_SIZES, check_budgets, get_client, get_user, get_violations)
+from rest_framework.authtoken.models import Token
+
+
+@pytest.mark.parametrize('page_size', PAGE_SIZES)
+def test_query_budgets(budget_data, page_size):
+    with get_client(get_user()) as client:
+        results = check_budgets(client, (page_size,))
+    assert get_violations(results) == []
+
+
+def test_client_leaves_no_token(budget_data):
+    user = get_user()
+    with get_client(user) as client:
+        assert client.get('/api/users/me/').status_code == 200
+    assert not Token.objects.filter(user=user).exists()
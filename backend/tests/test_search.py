@@ -0,0 +1,49 @@
+def search(client, query):
+    response = client.get('/api/recipes/', {'search': query, 'limit': 100})
+    assert response.status_code == 200
+    return [recipe['id'] for recipe in response.json()['results']]
+
+
+def create_recipe(client, payload, capture):
+    with capture(execute=True):
+        response = client.post('/api/recipes/', payload, format='json')
+    assert response.status_code == 201
+    return response.json()['id']
+
+
+def test_search_matches_word_forms(
+        user_client, recipe_payload, django_capture_on_commit_callbacks):
+    recipe_id = create_recipe(
+        user_client, recipe_payload('Шарлотка яблочная', 'Испечь пирог'),
+        django_capture_on_commit_callbacks)
+    assert recipe_id in search(user_client, 'шарлотки')
+    assert recipe_id in search(user_client, 'пирогами')
+    assert recipe_id not in search(user_client, 'шарлотка торт')
+
+
+def test_name_match_ranks_above_text_match(
+        user_client, recipe_payload, django_capture_on_commit_callbacks):
+    in_text = create_recipe(
+        user_client, recipe_payload('Пирог', 'Как шарлотка, но с грушей'),
+        django_capture_on_commit_callbacks)
+    in_name = create_recipe(
+        user_client, recipe_payload('Шарлотка', 'Испечь'),
+        django_capture_on_commit_callbacks)
+    assert search(user_client, 'шарлотка')[:2] == [in_name, in_text]
+
+
+def test_search_follows_recipe_changes(
+        user_client, recipe_payload, django_capture_on_commit_callbacks):
+    recipe_id = create_recipe(
+        user_client, recipe_payload('Шарлотка', 'Испечь пирог'),
+        django_capture_on_commit_callbacks)
+    assert recipe_id in search(user_client, 'шарлотка')
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.patch(
+            f'/api/recipes/{recipe_id}/', recipe_payload('Торт', 'Испечь'),
+            format='json')
+    assert recipe_id not in search(user_client, 'шарлотка')
+    assert recipe_id in search(user_client, 'торты')
+    with django_capture_on_commit_callbacks(execute=True):
+        user_client.delete(f'/api/recipes/{recipe_id}/')
+    assert recipe_id not in search(user_client, 'торт')
@@ -6,5 +6,6 @@ from .models import Follow, User
 UserAdmin.fieldsets += (
     ('Extra Fields', {'fields': ('avatar',)}),
 )
+UserAdmin.list_display += ('recipes_count', 'followers_count')
 admin.site.register(User, UserAdmin)
 admin.site.register(Follow)
@@ -35,6 +35,10 @@ class User(AbstractUser):
         'Пароль', max_length=PASSWORD_MAX_LENGTH)
     avatar = models.ImageField(
         'Аватар', upload_to='users/', null=True, default=None)
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов', default=0, editable=False)
+    followers_count = models.PositiveIntegerField(
+        'Подписчиков', default=0, editable=False)
 
     class Meta:
         verbose_name = 'Пользователь'